@@ -0,0 +1,32 @@
+bl_info = {
+    "name": "Arbor Barber",
+    "author": "Edward Zhou",
+    "version": (1, 0),
+    "blender": (3,2,2),
+    "location": "View3D > Toolbar > Arbor Barber",
+    "description": "Adds custom procedural trees",
+    "warning": "",
+    "wiki_url": "",
+    "category": "Add Mesh"
+}
+
+# the generation core only needs NumPy; bpy is imported when Blender registers the add-on
+from .core import COLLISION_MODES, GROWTH_MODES, Branch, BranchArrays, BranchList, Tree, defaultParameters, generateTree, generateTreeDefault, noise, noiseArray, remap, rotateAround, rotateAroundMany
+from .cache import DiskCache, TreeCache
+from .export import readPointCache, writeGlb, writeMesh, writeObj, writePly, writePointCache
+from .forest import ForestWind, generateForest
+from .instancing import InstancedTree
+from .lod import lodChain
+from .mesh import bakeWind, leafMesh, leafTransforms, toBlenderSpace, treeMesh, treeSkeleton, tubeMesh
+from .profiling import Profiler, profile
+from .storage import loadTree, saveTree
+from .stream import TreeStream, growStream, streamMesh
+
+
+def register():
+    from . import blender
+    blender.register()
+
+def unregister():
+    from . import blender
+    blender.unregister()
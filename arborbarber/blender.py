@@ -0,0 +1,709 @@
+"""Blender properties, operators and panels. Only this module imports bpy."""
+
+import bpy
+from math import pi
+from mathutils import Matrix
+import numpy as np
+import os
+import queue
+import random
+import tempfile
+import threading
+
+from .cache import DiskCache, TreeCache
+from .core import Tree, perlinTable, trunkLen, trunkWidth, minBranchingSize, maxBranchingSize, minNumBranch, maxNumBranch, minSplitAngle, maxSplitAngle, maxLevel, windVariation, windChaos
+from .export import writePointCache
+from .instancing import InstancedTree
+from .lod import lodChain
+from . import profiling
+from .mesh import LEAF_SEGMENTS, LEAF_RING_COUNT, LEAF_RADIUS, bakeWind, uvSphere, leafTransforms, toBlenderSpace, treeMesh, treeMeshVerts
+
+tree = None
+seed = random.randint(0, 100)
+# deepest collection instance nesting Blender still draws
+MAX_INSTANCE_NESTING = 8
+# frontier branches the background operator grows between checks for Esc
+GROWTH_CHUNK = 4096
+treeCache = TreeCache()
+
+def treeParameters(treeProperties):
+    """Return Tree keyword arguments for the values in the panel."""
+    return dict(trunkLen=treeProperties.trunk_len, trunkWidth=treeProperties.trunk_width, minBranchingSize=treeProperties.min_branching_size, maxBranchingSize=treeProperties.min_branching_size+treeProperties.max_branching_size, minNumBranch=treeProperties.min_num_branch, maxNumBranch=treeProperties.min_num_branch+treeProperties.max_num_branch, minSplitAngle=treeProperties.min_split_angle, maxSplitAngle=treeProperties.min_split_angle+treeProperties.max_split_angle, maxLevel=treeProperties.max_level, growthMode=treeProperties.growth_mode.lower(), clearance=treeProperties.branch_clearance, collisionMode=treeProperties.collision_mode.lower(), leafSpacing=treeProperties.leaf_spacing, leafCount=treeProperties.leaf_count, leafDensity=treeProperties.leaf_density)
+
+def meshSettings(treeProperties):
+    """Return everything besides growth and wind that decides a tree object's mesh."""
+    return dict(sides=treeProperties.branch_sides, leaves=treeProperties.has_leaves, leafMode=treeProperties.leaf_mode, leafSizeVariation=treeProperties.leaf_size_variation)
+
+def generateTreeBlender():
+    global tree
+    directory = bpy.context.scene.tree_adjust.cache_directory
+    treeCache.diskCache = DiskCache(bpy.path.abspath(directory)) if directory else None
+    treeCache.setMaxBytes(bpy.context.scene.tree_adjust.cache_budget << 20)
+    tree = treeCache.get(treeParameters(bpy.context.scene.tree_adjust), seed)
+
+def updateTreeWind(obj, windStrength):
+    """Blow an existing tree object again and move its vertices in place, without regrowing it.
+    :param obj: object made by the Add Tree operator
+    :type obj: bpy.types.Object
+    :param windStrength: new wind strength
+    :type windStrength: float
+    :returns: whether obj is a tree object that could be updated
+    :rtype: bool
+    """
+    settings = obj.get("arbor_barber")
+    if settings is None or obj.type != "MESH":
+        return False
+    settings = settings.to_dict()
+    tree = treeCache.get(settings["parameters"], settings["seed"])
+    tree.applyWind(windStrength, windVariation, windChaos)
+
+    leaves = None
+    if settings["leaves"] and settings["leafMode"] == "MESH":
+        leaves = leafTransforms(len(tree.leafIndices), np.random.default_rng(settings["seed"]), settings["leafSizeVariation"])
+    with profiling.stage("updateMesh") as record:
+        verts = treeMeshVerts(tree, settings["sides"], leaves)
+        record.count(vertices=len(verts))
+        if len(obj.data.vertices) != len(verts):
+            return False
+        obj.data.vertices.foreach_set("co", verts.astype(np.float32).ravel())
+    obj.data.update()
+
+    for child in obj.children:
+        if child.get("arbor_barber_leaves") and len(child.data.vertices) == len(tree.leafIndices):
+            child.data.vertices.foreach_set("co", toBlenderSpace(tree.leaves).astype(np.float32).ravel())
+            child.data.update()
+    return True
+
+def bakeTreeWind(obj, windStrength, frameStart, frameEnd, directory):
+    """Bake wind on a tree object into a PC2 file played back by a Mesh Cache modifier.
+    Every frame is computed up front, so playback and rendering only read vertex positions.
+    :param obj: object made by the Add Tree operator
+    :type obj: bpy.types.Object
+    :param windStrength: wind strength
+    :type windStrength: float
+    :param frameStart: first frame of the animation
+    :type frameStart: int
+    :param frameEnd: last frame of the animation
+    :type frameEnd: int
+    :param directory: directory the cache file is written to
+    :type directory: str
+    :returns: whether obj is a tree object that could be baked
+    :rtype: bool
+    """
+    settings = obj.get("arbor_barber")
+    if settings is None or obj.type != "MESH":
+        return False
+    settings = settings.to_dict()
+    tree = treeCache.get(settings["parameters"], settings["seed"])
+
+    leaves = None
+    if settings["leaves"] and settings["leafMode"] == "MESH":
+        leaves = leafTransforms(len(tree.leafIndices), np.random.default_rng(settings["seed"]), settings["leafSizeVariation"])
+    frames = bakeWind(tree, frameEnd - frameStart + 1, windStrength, windVariation, windChaos, settings["sides"], leaves)
+    if frames.shape[1] != len(obj.data.vertices):
+        return False
+
+    path = os.path.join(directory, bpy.path.clean_name(obj.name) + ".pc2")
+    writePointCache(path, frames, frameStart)
+    modifier = obj.modifiers.get("Wind") or obj.modifiers.new("Wind", "MESH_CACHE")
+    modifier.cache_format = "PC2"
+    modifier.filepath = path
+    modifier.frame_start = frameStart
+    return True
+
+def treeObjectArrays(tree, settings, treeSeed):
+    """Return the leaf transforms and mesh arrays of a tree object. Doesn't use bpy, so it can
+    run on a worker thread.
+    :param tree: grown tree
+    :type tree: Tree
+    :param settings: mesh settings from meshSettings
+    :type settings: dict
+    :param treeSeed: seed the tree was grown from, which also seeds the leaves
+    :type treeSeed: int
+    :returns: leaf rotations and scales or None, then float vertices, int32 face sizes and int32 face corners
+    :rtype: tuple
+    """
+    leaves = None
+    if settings["leaves"]:
+        leaves = leafTransforms(len(tree.leafIndices), np.random.default_rng(treeSeed), settings["leafSizeVariation"])
+    return (leaves,) + treeMesh(tree, settings["sides"], leaves if settings["leafMode"] == "MESH" else None)
+
+def addTreeObject(tree, settings, parameters, treeSeed, leaves, verts, faceSizes, faceVerts):
+    """Link a new tree object built from treeObjectArrays and make it the only selected object.
+    :returns: the new object
+    :rtype: bpy.types.Object
+    """
+    bpy.ops.object.select_all(action='DESELECT')
+    bpy.context.view_layer.objects.active = None
+
+    mesh = meshFromArrays("Tree", verts, faceSizes=faceSizes, faceVerts=faceVerts)
+    obj = bpy.data.objects.new("TreeObject", mesh)
+    bpy.context.collection.objects.link(obj)
+    obj.select_set(True)
+    bpy.context.view_layer.objects.active = obj
+    obj["arbor_barber"] = dict(settings, parameters=parameters, seed=treeSeed)
+
+    if leaves is not None and settings["leafMode"] == "INSTANCES":
+        addLeafInstances(obj, toBlenderSpace(tree.leaves), *leaves)
+    return obj
+
+def windStrengthChanged(treeProperties, context):
+    obj = context.active_object
+    if obj is not None:
+        updateTreeWind(obj, treeProperties.wind_strength)
+
+def profilingChanged(treeProperties, context):
+    profiling.disable()
+    if treeProperties.profiling:
+        profiling.enable(treeProperties.profile_allocations)
+
+def meshFromArrays(name, verts, edges=(), faceSizes=None, faceVerts=None):
+    """Create a mesh datablock from vertex, edge and face arrays using bulk foreach_set.
+    :param name: name of the new mesh
+    :type name: str
+    :param verts: vertex positions, shape (n, 3)
+    :type verts: numpy.ndarray
+    :param edges: vertex index pairs, shape (m, 2)
+    :type edges: numpy.ndarray
+    :param faceSizes: number of corners of each face
+    :type faceSizes: numpy.ndarray
+    :param faceVerts: vertex index of every face corner, faces one after another
+    :type faceVerts: numpy.ndarray
+    :returns: the new mesh
+    :rtype: bpy.types.Mesh
+    """
+    with profiling.stage("meshFromArrays") as record:
+        mesh = bpy.data.meshes.new(name)
+        mesh.vertices.add(len(verts))
+        mesh.vertices.foreach_set("co", np.asarray(verts, dtype=np.float32).ravel())
+        mesh.edges.add(len(edges))
+        mesh.edges.foreach_set("vertices", np.asarray(edges, dtype=np.int32).ravel())
+        if faceSizes is not None:
+            faceSizes = np.asarray(faceSizes, dtype=np.int32)
+            mesh.loops.add(len(faceVerts))
+            mesh.loops.foreach_set("vertex_index", np.asarray(faceVerts, dtype=np.int32))
+            mesh.polygons.add(len(faceSizes))
+            mesh.polygons.foreach_set("loop_start", np.cumsum(faceSizes, dtype=np.int32) - faceSizes)
+            # loop_total is derived from loop_start from Blender 4.0 on
+            if not mesh.polygons.bl_rna.properties["loop_total"].is_readonly:
+                mesh.polygons.foreach_set("loop_total", faceSizes)
+        mesh.update(calc_edges=faceSizes is not None)
+        record.count(vertices=len(verts), faces=0 if faceSizes is None else len(faceSizes))
+    return mesh
+
+def newGeometryNodeGroup(name):
+    """Create a geometry node group with a geometry input and output."""
+    group = bpy.data.node_groups.new(name, "GeometryNodeTree")
+    if hasattr(group, "interface"):
+        group.interface.new_socket(name="Geometry", in_out="INPUT", socket_type="NodeSocketGeometry")
+        group.interface.new_socket(name="Geometry", in_out="OUTPUT", socket_type="NodeSocketGeometry")
+    else:
+        group.inputs.new("NodeSocketGeometry", "Geometry")
+        group.outputs.new("NodeSocketGeometry", "Geometry")
+    return group
+
+def addLeafInstances(treeObj, positions, rotations, scales):
+    """Scatter one shared leaf mesh over the given points with geometry nodes instancing.
+    Memory stays at one leaf mesh plus a point per leaf however many leaves there are.
+    :returns: the point cloud object carrying the instances
+    :rtype: bpy.types.Object
+    """
+    collection = bpy.context.collection
+
+    verts, faceSizes, faceVerts = uvSphere(LEAF_SEGMENTS, LEAF_RING_COUNT, LEAF_RADIUS)
+    leaf = bpy.data.objects.new("Leaf", meshFromArrays("Leaf", verts, faceSizes=faceSizes, faceVerts=faceVerts))
+    collection.objects.link(leaf)
+    leaf.parent = treeObj
+    leaf.hide_set(True)
+    leaf.hide_render = True
+
+    mesh = meshFromArrays("LeafPoints", positions)
+    mesh.attributes.new("leaf_rotation", "FLOAT_VECTOR", "POINT").data.foreach_set("vector", np.asarray(rotations, dtype=np.float32).ravel())
+    mesh.attributes.new("leaf_scale", "FLOAT_VECTOR", "POINT").data.foreach_set("vector", np.asarray(scales, dtype=np.float32).ravel())
+    points = bpy.data.objects.new("Leaves", mesh)
+    collection.objects.link(points)
+    points.parent = treeObj
+    points["arbor_barber_leaves"] = True
+
+    group = newGeometryNodeGroup("ArborBarberLeaves")
+    nodes = group.nodes
+    links = group.links
+    groupIn = nodes.new("NodeGroupInput")
+    groupOut = nodes.new("NodeGroupOutput")
+    leafInfo = nodes.new("GeometryNodeObjectInfo")
+    leafInfo.inputs["Object"].default_value = leaf
+    rotation = nodes.new("GeometryNodeInputNamedAttribute")
+    rotation.data_type = "FLOAT_VECTOR"
+    rotation.inputs["Name"].default_value = "leaf_rotation"
+    scale = nodes.new("GeometryNodeInputNamedAttribute")
+    scale.data_type = "FLOAT_VECTOR"
+    scale.inputs["Name"].default_value = "leaf_scale"
+    instance = nodes.new("GeometryNodeInstanceOnPoints")
+    links.new(groupIn.outputs[0], instance.inputs["Points"])
+    links.new(leafInfo.outputs["Geometry"], instance.inputs["Instance"])
+    links.new(rotation.outputs["Attribute"], instance.inputs["Rotation"])
+    links.new(scale.outputs["Attribute"], instance.inputs["Scale"])
+    links.new(instance.outputs["Instances"], groupOut.inputs[0])
+
+    points.modifiers.new("Leaves", "NODES").node_group = group
+    return points
+
+def addInstancedTree(instancedTree, name="TreeObject"):
+    """Build an instanced tree as one collection per level, each holding its template mesh and
+    collection instances of the next level's collection. Levels past Blender's instance nesting
+    limit are expanded into the deepest collection's mesh.
+    :param instancedTree: tree to add
+    :type instancedTree: InstancedTree
+    :returns: the empty instancing the trunk's collection into the scene
+    :rtype: bpy.types.Object
+    """
+    # Blender stops expanding collection instances nested deeper than this, so the deepest levels share one expanded mesh
+    depth = min(len(instancedTree.meshes), MAX_INSTANCE_NESTING)
+    collections = []
+    for level in range(depth):
+        verts, faceSizes, faceVerts = instancedTree.mesh(level) if level == depth - 1 else instancedTree.meshes[level]
+        levelName = "%s_Level%d" % (name, level)
+        # level collections are only reachable through the instances, so they never draw on their own
+        collection = bpy.data.collections.new(levelName)
+        collection.objects.link(bpy.data.objects.new(levelName, meshFromArrays(levelName, verts, faceSizes=faceSizes, faceVerts=faceVerts)))
+        collections.append(collection)
+
+    for level, placements in enumerate(instancedTree.placements[:depth - 1]):
+        for placement in placements:
+            instance = bpy.data.objects.new("%s_Level%d" % (name, level + 1), None)
+            instance.instance_type = "COLLECTION"
+            instance.instance_collection = collections[level + 1]
+            instance.matrix_basis = Matrix(placement.tolist())
+            collections[level].objects.link(instance)
+
+    root = bpy.data.objects.new(name, None)
+    root.instance_type = "COLLECTION"
+    root.instance_collection = collections[0]
+    bpy.context.collection.objects.link(root)
+    return root
+
+class TreeProperties(bpy.types.PropertyGroup):
+    trunk_len : bpy.props.FloatProperty(name="Trunk Length", min=0, soft_min=0, soft_max=4, step=1)
+    trunk_width: bpy.props.FloatProperty(name="Trunk Width", min=0.1, soft_min=0.1, soft_max=32, step=1)
+    min_branching_size: bpy.props.FloatProperty(name="Min Branch Size", min=0.1, soft_min=0.1, soft_max=1, step=1)
+    max_branching_size: bpy.props.FloatProperty(name="Branch Size Var", min=0, soft_min=0, soft_max=1, step=1)
+    min_num_branch: bpy.props.IntProperty(name="Min Split Number", min=1, soft_min=1, soft_max=5)
+    max_num_branch: bpy.props.IntProperty(name="Split Number Var", min=0, soft_min=0, soft_max=5)
+    min_split_angle: bpy.props.FloatProperty(name="Min Split Angle", min=0, soft_min=0, soft_max=(pi/2), subtype="ANGLE")
+    max_split_angle: bpy.props.FloatProperty(name="Split Angle Var", min=0, soft_min=0, soft_max=(pi/2), subtype="ANGLE")
+    max_level: bpy.props.IntProperty(name="Max Tree Level", min=0, soft_min=0, soft_max=10)
+    branch_clearance: bpy.props.FloatProperty(name="Branch Clearance", description="Shorten or drop new branches passing closer than this to others; 0 lets branches cross", min=0, soft_max=0.2, step=0.1, precision=3)
+    collision_mode: bpy.props.EnumProperty(name="Collision Mode", items=[("SHORTEN", "Shorten", "End colliding branches before they reach the branch in their way"), ("REJECT", "Reject", "Drop colliding branches")])
+    branch_sides: bpy.props.IntProperty(name="Branch Sides", min=3, soft_min=3, soft_max=16, default=6)
+    growth_mode: bpy.props.EnumProperty(name="Growth Mode", items=[("COMPATIBLE", "Compatible", "Reproduce trees from earlier versions for the same seed"), ("VECTORIZED", "Vectorized", "Sample each level at once; fastest for deep trees"), ("COUNTER", "Counter", "Hash each branch's values from the seed and its path, so subtrees can be regrown independently")])
+    
+    wind_strength: bpy.props.FloatProperty(name="Wind Strength", min=0, soft_min=0, soft_max=1, step=1, update=windStrengthChanged)
+    instance_subtrees: bpy.props.BoolProperty(name="Instance Subtrees", description="Draw each level's split values once so every subtree of a level is a rotated copy, and build the tree from nested collection instances; wind is not applied")
+    has_leaves: bpy.props.BoolProperty(name="Has Leaves")
+    leaf_mode: bpy.props.EnumProperty(name="Leaf Mode", items=[("MESH", "Mesh", "Build every leaf into the tree mesh"), ("INSTANCES", "Instances", "Instance one leaf mesh on points with geometry nodes")])
+    leaf_size_variation: bpy.props.FloatProperty(name="Leaf Size Var", min=0, max=1, soft_min=0, soft_max=1, step=1)
+    leaf_spacing: bpy.props.FloatProperty(name="Leaf Spacing", description="Drop leaves closer than this to a kept leaf; 0 keeps them all", min=0, soft_max=0.5, step=0.1, precision=3)
+    leaf_count: bpy.props.IntProperty(name="Leaf Count", description="Thin the leaves down to about this many; 0 for no target", min=0, soft_max=100000)
+    leaf_density: bpy.props.FloatProperty(name="Leaf Density", description="Thin the leaves down to about this many per unit volume of their bounding box; 0 for no target", min=0, soft_max=1000)
+    bake_directory: bpy.props.StringProperty(name="Bake Directory", subtype="DIR_PATH", default="//")
+    cache_budget: bpy.props.IntProperty(name="Cache Budget (MB)", description="Memory the trees kept for reuse in this session may take", min=1, soft_max=4096, default=256)
+    cache_directory: bpy.props.StringProperty(name="Tree Cache", description="Directory grown trees are saved to and loaded from across sessions; empty to disable", subtype="DIR_PATH")
+    lod_count: bpy.props.IntProperty(name="LOD Count", min=1, soft_max=8, default=4)
+    lod_pixels: bpy.props.IntProperty(name="LOD0 Screen Height", description="On-screen height in pixels the most detailed LOD is made for; each further LOD halves it", min=1, soft_max=4096, default=1024, subtype="PIXEL")
+    profiling: bpy.props.BoolProperty(name="Profile Stages", description="Record the time and counts of every pipeline stage", update=profilingChanged)
+    profile_allocations: bpy.props.BoolProperty(name="Trace Allocations", description="Also record allocations while profiling, which slows everything down", update=profilingChanged)
+    
+class AddTreeOperator(bpy.types.Operator):
+    bl_idname = "tree.add_tree"
+    bl_label = "Add Tree Mesh Object"
+    
+    
+    def execute(self, context):
+        treeProperties = bpy.context.scene.tree_adjust
+        if treeProperties.instance_subtrees:
+            bpy.ops.object.select_all(action='DESELECT')
+            parameters = treeParameters(treeProperties)
+            del parameters["growthMode"]
+            obj = addInstancedTree(InstancedTree(seed, treeProperties.branch_sides, treeProperties.has_leaves, treeProperties.leaf_size_variation, **parameters))
+            obj.select_set(True)
+            bpy.context.view_layer.objects.active = obj
+            self.report({"INFO"}, "Instanced trees draw from their own generator and spin every subtree, so they differ from the regular tree for this seed")
+            ignored = [name for name, value in (("Branch Clearance", treeProperties.branch_clearance), ("Leaf Spacing", treeProperties.leaf_spacing),
+                       ("Leaf Count", treeProperties.leaf_count), ("Leaf Density", treeProperties.leaf_density)) if value]
+            if ignored:
+                # reported last, so the status bar shows it
+                self.report({"WARNING"}, "Instance Subtrees ignores %s" % ", ".join(ignored))
+            return {"FINISHED"}
+
+        generateTreeBlender()
+        tree.applyWind(treeProperties.wind_strength, windVariation, windChaos)
+        settings = meshSettings(treeProperties)
+        addTreeObject(tree, settings, treeParameters(treeProperties), seed, *treeObjectArrays(tree, settings, seed))
+        return {"FINISHED"}
+
+class GenerationJob:
+    """Grows a tree and builds its mesh arrays on a worker thread, never touching bpy.
+    The tree is created, and so seeded, on the main thread; growing only draws from its own
+    generator, so operators reseeding the random module meanwhile can't change it.
+    Updates are queued for the operator polling it: ("level", level, mesh arrays) after each
+    level for the preview, then ("done", tree, leaves, mesh arrays) or ("error", message).
+    Cancellation is checked every GROWTH_CHUNK frontier branches, so a deep level stops promptly.
+    """
+
+    def __init__(self, tree, treeSeed, windStrength, settings):
+        self.tree = tree
+        self.seed = treeSeed
+        self.windStrength = windStrength
+        self.settings = settings
+        self.cancelled = threading.Event()
+        self.updates = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        try:
+            tree = self.tree
+            while not tree.hasLeaves:
+                for _ in tree.growChunks(GROWTH_CHUNK):
+                    if self.cancelled.is_set():
+                        return
+                if self.cancelled.is_set():
+                    return
+                if not tree.hasLeaves:
+                    self.updates.put(("level", tree.growthLevel, treeMesh(tree, self.settings["sides"])))
+            tree.applyWind(self.windStrength, windVariation, windChaos)
+            arrays = treeObjectArrays(tree, self.settings, self.seed)
+            if not self.cancelled.is_set():
+                self.updates.put(("done", tree) + arrays)
+        except Exception as error:
+            self.updates.put(("error", str(error)))
+
+class AddTreeModalOperator(bpy.types.Operator):
+    """Grow the tree in the background, previewing each level as it grows; Esc cancels"""
+    bl_idname = "tree.add_tree_modal"
+    bl_label = "Add Tree in Background"
+
+    def invoke(self, context, event):
+        treeProperties = context.scene.tree_adjust
+        self.parameters = treeParameters(treeProperties)
+        self.settings = meshSettings(treeProperties)
+        self.seed = seed
+        # the noise table fills itself from the random module on first use, which must not happen on the worker
+        perlinTable()
+        random.seed(seed)
+        self.job = GenerationJob(Tree(**self.parameters), seed, treeProperties.wind_strength, self.settings)
+        self.preview = None
+
+        windowManager = context.window_manager
+        self.timer = windowManager.event_timer_add(0.1, window=context.window)
+        windowManager.modal_handler_add(self)
+        windowManager.progress_begin(0, self.parameters["maxLevel"])
+        self.job.thread.start()
+        return {"RUNNING_MODAL"}
+
+    def modal(self, context, event):
+        if event.type == "ESC":
+            self.job.cancelled.set()
+            self.finish(context)
+            self.report({"INFO"}, "Tree generation cancelled")
+            return {"CANCELLED"}
+        if event.type != "TIMER":
+            return {"PASS_THROUGH"}
+
+        while not self.job.updates.empty():
+            update = self.job.updates.get()
+            if update[0] == "level":
+                level, verts, faceSizes, faceVerts = update[1:]
+                self.showPreview(context, meshFromArrays("TreePreview", verts, faceSizes=faceSizes, faceVerts=faceVerts))
+                context.window_manager.progress_update(level)
+                context.workspace.status_text_set("Growing tree: level %d of %d, Esc to cancel" % (level, self.parameters["maxLevel"]))
+            elif update[0] == "done":
+                self.finish(context)
+                treeCache.put(self.parameters, self.seed, update[1])
+                addTreeObject(update[1], self.settings, self.parameters, self.seed, *update[2:])
+                return {"FINISHED"}
+            else:
+                self.finish(context)
+                self.report({"ERROR"}, "Tree generation failed: %s" % update[1])
+                return {"CANCELLED"}
+        return {"PASS_THROUGH"}
+
+    def showPreview(self, context, mesh):
+        """Show the levels grown so far, replacing the previous preview's mesh."""
+        if self.preview is None:
+            self.preview = bpy.data.objects.new("TreePreview", mesh)
+            context.collection.objects.link(self.preview)
+            self.preview.display_type = "WIRE"
+            self.preview.hide_render = True
+        else:
+            previous = self.preview.data
+            self.preview.data = mesh
+            bpy.data.meshes.remove(previous)
+
+    def finish(self, context):
+        """Stop polling and remove the preview, leaving nothing half built behind."""
+        windowManager = context.window_manager
+        windowManager.event_timer_remove(self.timer)
+        windowManager.progress_end()
+        context.workspace.status_text_set(None)
+        if self.preview is not None:
+            mesh = self.preview.data
+            bpy.data.objects.remove(self.preview)
+            bpy.data.meshes.remove(mesh)
+            self.preview = None
+
+class AddTreeLODsOperator(bpy.types.Operator):
+    bl_idname = "tree.add_lods"
+    bl_label = "Add Tree LOD Set"
+
+    def execute(self, context):
+        generateTreeBlender()
+        treeProperties = context.scene.tree_adjust
+        tree.applyWind(treeProperties.wind_strength, windVariation, windChaos)
+
+        leaves = None
+        if treeProperties.has_leaves:
+            leaves = leafTransforms(len(tree.leafIndices), np.random.default_rng(seed), treeProperties.leaf_size_variation)
+        pixelHeights = [treeProperties.lod_pixels / 2**lod for lod in range(treeProperties.lod_count)]
+
+        collection = bpy.data.collections.new("TreeLODs")
+        context.collection.children.link(collection)
+        meshes = lodChain(tree, pixelHeights, treeProperties.branch_sides, leaves)
+        for lod, (verts, faceSizes, faceVerts) in enumerate(meshes):
+            obj = bpy.data.objects.new("TreeObject_LOD%d" % lod, meshFromArrays("Tree_LOD%d" % lod, verts, faceSizes=faceSizes, faceVerts=faceVerts))
+            collection.objects.link(obj)
+            # only the most detailed LOD is shown; the rest are swapped in by the user or a LOD system
+            obj.hide_set(lod > 0)
+            obj.hide_render = lod > 0
+        if len(meshes) < len(pixelHeights):
+            self.report({"INFO"}, "Only %d LODs added; the tree can't be simplified any further" % len(meshes))
+        return {"FINISHED"}
+
+class UpdateWindOperator(bpy.types.Operator):
+    bl_idname = "tree.update_wind"
+    bl_label = "Update Wind on Selected Trees"
+
+    def execute(self, context):
+        windStrength = context.scene.tree_adjust.wind_strength
+        for obj in context.selected_objects:
+            updateTreeWind(obj, windStrength)
+        return {"FINISHED"}
+
+class BakeWindOperator(bpy.types.Operator):
+    bl_idname = "tree.bake_wind"
+    bl_label = "Bake Wind Animation"
+
+    def execute(self, context):
+        scene = context.scene
+        directory = bpy.path.abspath(scene.tree_adjust.bake_directory) or tempfile.gettempdir()
+        baked = [obj for obj in context.selected_objects if bakeTreeWind(obj, scene.tree_adjust.wind_strength, scene.frame_start, scene.frame_end, directory)]
+        if not baked:
+            self.report({"WARNING"}, "No selected tree objects could be baked")
+            return {"CANCELLED"}
+        return {"FINISHED"}
+
+class ClearCacheOperator(bpy.types.Operator):
+    bl_idname = "tree.clear_cache"
+    bl_label = "Clear Tree Cache"
+
+    def execute(self, context):
+        treeCache.clear()
+        return {"FINISHED"}
+
+class ClearProfileOperator(bpy.types.Operator):
+    bl_idname = "tree.clear_profile"
+    bl_label = "Clear Profile"
+
+    def execute(self, context):
+        if profiling.activeProfiler is not None:
+            profiling.activeProfiler.clear()
+        return {"FINISHED"}
+
+class RandomizeSeedOperator(bpy.types.Operator):
+    bl_idname = "tree.randomize_seed"
+    bl_label = "Randomize Tree Seed"
+    
+    def execute(self, context):
+        global seed
+        seed += random.randint(0,100)
+        return {"FINISHED"}
+    
+class InitializeValuesOperator(bpy.types.Operator):
+    bl_idname = "tree.reset_values"
+    bl_label = "Reset Tree Settings"
+    
+    def execute(self, context):
+        bpy.context.scene.tree_adjust.trunk_len = trunkLen
+        bpy.context.scene.tree_adjust.trunk_width = trunkWidth
+        bpy.context.scene.tree_adjust.min_branching_size = minBranchingSize
+        bpy.context.scene.tree_adjust.max_branching_size = maxBranchingSize-minBranchingSize
+        bpy.context.scene.tree_adjust.min_num_branch = minNumBranch
+        bpy.context.scene.tree_adjust.max_num_branch = maxNumBranch-minNumBranch
+        bpy.context.scene.tree_adjust.min_split_angle = minSplitAngle
+        bpy.context.scene.tree_adjust.max_split_angle = maxSplitAngle-minSplitAngle
+        bpy.context.scene.tree_adjust.max_level = maxLevel
+        bpy.context.scene.tree_adjust.growth_mode = "COMPATIBLE"
+        bpy.context.scene.tree_adjust.instance_subtrees = False
+        bpy.context.scene.tree_adjust.branch_clearance = 0
+        bpy.context.scene.tree_adjust.collision_mode = "SHORTEN"
+        bpy.context.scene.tree_adjust.branch_sides = 6
+
+        bpy.context.scene.tree_adjust.wind_strength = 0
+        bpy.context.scene.tree_adjust.has_leaves = True
+        bpy.context.scene.tree_adjust.leaf_mode = "MESH"
+        bpy.context.scene.tree_adjust.leaf_size_variation = 0
+        bpy.context.scene.tree_adjust.leaf_spacing = 0
+        bpy.context.scene.tree_adjust.leaf_count = 0
+        bpy.context.scene.tree_adjust.leaf_density = 0
+        bpy.context.scene.tree_adjust.cache_budget = 256
+        bpy.context.scene.tree_adjust.lod_count = 4
+        bpy.context.scene.tree_adjust.lod_pixels = 1024
+        bpy.context.scene.tree_adjust.profiling = False
+        bpy.context.scene.tree_adjust.profile_allocations = False
+        return {"FINISHED"}
+    
+class MainPanel(bpy.types.Panel):
+    bl_label = "Arbor Barber"
+    bl_idname = "PT_ArborBarber"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'Arbor Barber'
+    
+    def draw(self, context):
+        layout = self.layout
+        scene = context.scene
+        treetool = scene.tree_adjust
+        
+        row = layout.row()
+        row.label(text="Add Tree", icon='CUBE')
+        row = layout.row()
+        row.operator("tree.add_tree")
+        row = layout.row()
+        row.operator("tree.add_tree_modal")
+        row = layout.row()
+        row.operator("tree.add_lods")
+        row = layout.row()
+        row.operator("tree.randomize_seed")
+        row = layout.row()
+        row.operator("tree.reset_values")
+
+class PanelOptions(bpy.types.Panel):
+    bl_label = "Tree Settings"
+    bl_idname = "PT_TreeSettings"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'Tree Settings'
+    bl_parent_id = 'PT_ArborBarber'
+    
+    def draw(self, context):
+        layout = self.layout
+        scene = context.scene
+        treetool = scene.tree_adjust
+        
+        row = layout.prop(treetool, "trunk_len")
+        row = layout.prop(treetool, "trunk_width")
+        row = layout.prop(treetool, "min_branching_size")
+        row = layout.prop(treetool, "min_num_branch")
+        row = layout.prop(treetool, "min_split_angle")
+        row = layout.prop(treetool, "max_level")
+        row = layout.prop(treetool, "growth_mode")
+        row = layout.prop(treetool, "instance_subtrees")
+        row = layout.prop(treetool, "branch_clearance")
+        row = layout.prop(treetool, "collision_mode")
+        row = layout.prop(treetool, "branch_sides")
+        row = layout.prop(treetool, "has_leaves")
+        row = layout.prop(treetool, "leaf_mode")
+        row = layout.prop(treetool, "leaf_size_variation")
+        row = layout.prop(treetool, "leaf_spacing")
+        row = layout.prop(treetool, "leaf_count")
+        row = layout.prop(treetool, "leaf_density")
+        row = layout.prop(treetool, "lod_count")
+        row = layout.prop(treetool, "lod_pixels")
+        row = layout.prop(treetool, "cache_budget")
+        row = layout.prop(treetool, "cache_directory")
+        row = layout.row()
+        row.label(text="Cached: %d trees, %.1f MB, %d hits, %d misses" % (len(treeCache), treeCache.bytes / (1 << 20), treeCache.hits, treeCache.misses))
+        row = layout.row()
+        row.operator("tree.clear_cache")
+
+
+class PanelVariations(bpy.types.Panel):
+    bl_label = "Tree Variation"
+    bl_idname = "PT_TreeVariation"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'Tree Variation'
+    bl_parent_id = 'PT_ArborBarber'
+    
+    def draw(self, context):
+        layout = self.layout
+        scene = context.scene
+        treetool = scene.tree_adjust
+
+        row = layout.prop(treetool, "max_branching_size")
+        row = layout.prop(treetool, "max_num_branch")
+        row = layout.prop(treetool, "max_split_angle")
+
+class PanelWind(bpy.types.Panel):
+    bl_label = "Wind Settings"
+    bl_idname = "PT_WindSettings"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'Wind Settings'
+    bl_parent_id = 'PT_ArborBarber'
+    
+    def draw(self, context):
+        layout = self.layout
+        scene = context.scene
+        treetool = scene.tree_adjust
+
+        row = layout.prop(treetool, "wind_strength")
+        row = layout.row()
+        row.operator("tree.update_wind")
+        row = layout.prop(treetool, "bake_directory")
+        row = layout.row()
+        row.operator("tree.bake_wind")
+
+class PanelProfiling(bpy.types.Panel):
+    bl_label = "Profiling"
+    bl_idname = "PT_Profiling"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'Profiling'
+    bl_parent_id = 'PT_ArborBarber'
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        layout = self.layout
+        scene = context.scene
+        treetool = scene.tree_adjust
+
+        row = layout.prop(treetool, "profiling")
+        row = layout.prop(treetool, "profile_allocations")
+        if profiling.activeProfiler is None:
+            return
+        for stageRow in profiling.activeProfiler.summary():
+            counts = ", ".join("%s %d" % (name, value) for name, value in stageRow.items() if name not in ("stage", "calls", "seconds", "maxSeconds"))
+            row = layout.row()
+            row.label(text="%s: %d calls, %.1f ms" % (stageRow["stage"], stageRow["calls"], 1000 * stageRow["seconds"]))
+            if counts:
+                row = layout.row()
+                row.label(text="    " + counts)
+        row = layout.row()
+        row.operator("tree.clear_profile")
+    
+
+classes = [TreeProperties, AddTreeOperator, AddTreeModalOperator, AddTreeLODsOperator, UpdateWindOperator, BakeWindOperator, ClearCacheOperator, ClearProfileOperator, RandomizeSeedOperator, InitializeValuesOperator, MainPanel, PanelOptions, PanelVariations, PanelWind, PanelProfiling,]
+
+
+def register():
+
+    for cls in classes:
+        bpy.utils.register_class(cls)
+    bpy.types.Scene.tree_adjust = bpy.props.PointerProperty(type=TreeProperties)
+    print(bpy.types.Scene.tree_adjust)
+
+def unregister():
+    
+    del bpy.types.Scene.tree_adjust
+    for cls in classes:
+        bpy.utils.unregister_class(cls)
@@ -0,0 +1,137 @@
+"""Reuse of grown trees between generations that only change wind or mesh options, in memory and on disk."""
+
+from collections import OrderedDict
+import copy
+import hashlib
+import json
+import os
+import tempfile
+
+from .core import generateTree
+from .storage import TREE_VERSION, loadTree, saveTree
+
+
+def treeKey(parameters, seed):
+    """Return a hashable key for growth parameters and a seed, ignoring maxLevel.
+    Trees that differ only in max level share a key, since one can be regrown into the other.
+    """
+    return (tuple(sorted((name, value) for name, value in parameters.items() if name != "maxLevel")), seed)
+
+
+def contentHash(parameters, seed):
+    """Return a hex digest identifying the tree grown from parameters and seed."""
+    content = json.dumps(dict(parameters=parameters, seed=seed, version=TREE_VERSION), sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class DiskCache:
+    """Content-addressed directory of tree files, shared between sessions and machines.
+    Files are named by the hash of their parameters and seed and are written under a temporary
+    name and renamed into place, so several processes can fill the same directory.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, parameters, seed):
+        return os.path.join(self.directory, contentHash(parameters, seed) + ".arbtree")
+
+    def get(self, parameters, seed):
+        """Return the tree for parameters and seed, loading it if it was ever saved and growing
+        and saving it otherwise.
+        :param parameters: keyword arguments for Tree
+        :type parameters: dict
+        :param seed: tree seed
+        :type seed: int
+        :rtype: Tree
+        """
+        path = self.path(parameters, seed)
+        if os.path.exists(path):
+            return loadTree(path)[0]
+        tree = generateTree(seed, **parameters)
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(prefix="arborbarber-", suffix=".tmp", dir=self.directory)
+        os.close(fd)
+        try:
+            saveTree(temporary, tree, seed)
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+        return tree
+
+
+class TreeCache:
+    """Least recently used cache of grown trees, bounded by the bytes of their branch arrays.
+    Wind is always evaluated from each branch's still position, so a cached tree can be blown
+    again any number of times without regrowing it. A tree that differs from a cached one only
+    in max level is grown or pruned from a copy of it, keeping both for A/B comparisons.
+    """
+
+    def __init__(self, maxBytes=256 << 20, diskCache=None):
+        # (treeKey, maxLevel) -> (tree, bytes), least recently used first
+        self.entries = OrderedDict()
+        self.maxBytes = maxBytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # optional DiskCache consulted before growing a tree that isn't in memory
+        self.diskCache = diskCache
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, parameters, seed):
+        """Return the tree for parameters and seed, growing it only if it isn't cached.
+        :param parameters: keyword arguments for Tree
+        :type parameters: dict
+        :param seed: tree seed
+        :type seed: int
+        :rtype: Tree
+        """
+        key = (treeKey(parameters, seed), parameters["maxLevel"])
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key][0]
+
+        self.misses += 1
+        related = [entry for entryKey, entry in self.entries.items() if entryKey[0] == key[0]]
+        if related:
+            tree = copy.deepcopy(related[-1][0])
+            tree.setMaxLevel(parameters["maxLevel"])
+        elif self.diskCache is not None:
+            tree = self.diskCache.get(parameters, seed)
+        else:
+            tree = generateTree(seed, **parameters)
+        self.add(key, tree)
+        return tree
+
+    def put(self, parameters, seed, tree):
+        """Cache a tree grown elsewhere, e.g. on a worker thread, under its parameters and seed."""
+        key = (treeKey(parameters, seed), parameters["maxLevel"])
+        if key not in self.entries:
+            self.add(key, tree)
+
+    def add(self, key, tree):
+        size = tree.data.nbytes
+        self.entries[key] = (tree, size)
+        self.bytes += size
+        self.evict()
+
+    def setMaxBytes(self, maxBytes):
+        self.maxBytes = maxBytes
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used trees until the cache fits its budget.
+        The newest tree stays even if it alone is over budget.
+        """
+        while self.bytes > self.maxBytes and len(self.entries) > 1:
+            self.bytes -= self.entries.popitem(last=False)[1][1]
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
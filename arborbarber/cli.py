@@ -0,0 +1,113 @@
+"""Command line tree generation: python -m arborbarber [options] output.(npz|obj|ply|glb)"""
+
+import argparse
+import json
+import os
+import tempfile
+from math import degrees, radians
+import numpy as np
+
+from .cache import DiskCache
+from .core import COLLISION_MODES, GROWTH_MODES, BranchArrays, defaultParameters, generateTree, windChaos, windVariation
+from .export import MESH_WRITERS, writeMesh, writePointCache
+from .instancing import InstancedTree
+from .lod import lodChain
+from .mesh import bakeWind, leafTransforms, treeMesh
+from .stream import growStream, streamMesh
+
+
+def parseArgs(argv=None):
+    defaults = defaultParameters()
+    parser = argparse.ArgumentParser(prog="arborbarber", description="Generate a fractal tree without Blender and write its geometry to disk.")
+    parser.add_argument("output", help="file to write: .npz for the mesh and branch arrays, or a .obj, .ply or .glb mesh")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trunk-len", type=float, default=defaults["trunkLen"])
+    parser.add_argument("--trunk-width", type=float, default=defaults["trunkWidth"])
+    parser.add_argument("--min-branching-size", type=float, default=defaults["minBranchingSize"])
+    parser.add_argument("--max-branching-size", type=float, default=defaults["maxBranchingSize"])
+    parser.add_argument("--min-num-branch", type=int, default=defaults["minNumBranch"])
+    parser.add_argument("--max-num-branch", type=int, default=defaults["maxNumBranch"])
+    parser.add_argument("--min-split-angle", type=float, default=degrees(defaults["minSplitAngle"]), help="degrees")
+    parser.add_argument("--max-split-angle", type=float, default=degrees(defaults["maxSplitAngle"]), help="degrees")
+    parser.add_argument("--max-level", type=int, default=defaults["maxLevel"])
+    parser.add_argument("--growth-mode", choices=GROWTH_MODES, default="compatible")
+    parser.add_argument("--clearance", type=float, default=0, help="shorten or drop new branches passing closer than this to others; 0 disables the check")
+    parser.add_argument("--collision-mode", choices=COLLISION_MODES, default="shorten")
+    parser.add_argument("--wind-strength", type=float, default=0)
+    parser.add_argument("--wind-frames", type=int, default=0, help="also bake this many frames of wind into a .pc2 point cache")
+    parser.add_argument("--wind-cache", help="path of the .pc2 file, by default the output path with a .pc2 suffix")
+    parser.add_argument("--stream", action="store_true", help="grow generation by generation through a temporary file and export the mesh in pieces, for trees too large for memory; needs a mesh output and no wind")
+    parser.add_argument("--instanced", action="store_true", help="draw split values once per level so every subtree of a level is a rotated copy of one template")
+    parser.add_argument("--lods", type=int, default=0, help="write this many levels of detail as <output>_lod<i> meshes instead of one mesh")
+    parser.add_argument("--lod-pixels", type=float, default=1024, help="on-screen height in pixels of the most detailed LOD; each further LOD halves it")
+    parser.add_argument("--cache-dir", help="load the tree from this directory if it was grown before, and save it there otherwise")
+    parser.add_argument("--sides", type=int, default=6, help="vertices around each branch ring")
+    parser.add_argument("--no-leaves", action="store_true")
+    parser.add_argument("--leaf-size-variation", type=float, default=0)
+    parser.add_argument("--leaf-spacing", type=float, default=0, help="drop leaves closer than this to a kept one")
+    parser.add_argument("--leaf-count", type=int, default=0, help="thin the leaves down to about this many")
+    parser.add_argument("--leaf-density", type=float, default=0, help="thin the leaves down to about this many per unit volume of their bounding box")
+    args = parser.parse_args(argv)
+    extension = os.path.splitext(args.output)[1].lower()
+    if extension != ".npz" and extension not in MESH_WRITERS:
+        parser.error("output must end in .npz, " + ", ".join(MESH_WRITERS))
+    if args.stream and (extension == ".npz" or args.wind_strength or args.wind_frames or args.lods):
+        parser.error("--stream writes still .obj, .ply or .glb meshes only")
+    if args.clearance and (args.stream or args.instanced):
+        parser.error("--clearance can't be combined with --stream or --instanced")
+    if args.instanced and (args.leaf_spacing or args.leaf_count or args.leaf_density):
+        parser.error("--instanced has one leaf per template and can't thin leaves")
+    if args.instanced and (extension == ".npz" or args.stream or args.wind_strength or args.wind_frames or args.lods):
+        parser.error("--instanced writes still .obj, .ply or .glb meshes only")
+    if args.lods and extension == ".npz":
+        parser.error("--lods needs a .obj, .ply or .glb output")
+    return args
+
+def treeParameters(args):
+    """Return Tree keyword arguments for parsed command line options."""
+    return dict(trunkLen=args.trunk_len, trunkWidth=args.trunk_width, minBranchingSize=args.min_branching_size, maxBranchingSize=args.max_branching_size, minNumBranch=args.min_num_branch, maxNumBranch=args.max_num_branch, minSplitAngle=radians(args.min_split_angle), maxSplitAngle=radians(args.max_split_angle), maxLevel=args.max_level, growthMode=args.growth_mode, clearance=args.clearance, collisionMode=args.collision_mode, leafSpacing=args.leaf_spacing, leafCount=args.leaf_count, leafDensity=args.leaf_density)
+
+def main(argv=None):
+    args = parseArgs(argv)
+    parameters = treeParameters(args)
+    if args.stream:
+        fd, path = tempfile.mkstemp(prefix="arborbarber-", suffix=".bin", dir=os.path.dirname(os.path.abspath(args.output)))
+        os.close(fd)
+        try:
+            stream = growStream(path, args.seed, **parameters)
+            writeMesh(args.output, streamMesh(stream, args.sides, None if args.no_leaves else args.seed, args.leaf_size_variation))
+        finally:
+            os.unlink(path)
+        return
+
+    if args.instanced:
+        parameters.pop("growthMode")
+        writeMesh(args.output, [InstancedTree(args.seed, args.sides, not args.no_leaves, args.leaf_size_variation, **parameters).mesh()])
+        return
+
+    if args.cache_dir:
+        tree = DiskCache(args.cache_dir).get(parameters, args.seed)
+    else:
+        tree = generateTree(args.seed, **parameters)
+    if args.wind_strength:
+        tree.applyWind(args.wind_strength, windVariation, windChaos)
+
+    leaves = None
+    if not args.no_leaves:
+        leaves = leafTransforms(len(tree.leafIndices), np.random.default_rng(args.seed), args.leaf_size_variation)
+    if args.lods:
+        base, extension = os.path.splitext(args.output)
+        pixelHeights = [args.lod_pixels / 2**lod for lod in range(args.lods)]
+        for lod, mesh in enumerate(lodChain(tree, pixelHeights, args.sides, leaves)):
+            writeMesh("%s_lod%d%s" % (base, lod, extension), [mesh])
+        return
+    verts, faceSizes, faceVerts = treeMesh(tree, args.sides, leaves)
+    if args.wind_frames > 0:
+        writePointCache(args.wind_cache or os.path.splitext(args.output)[0] + ".pc2", bakeWind(tree, args.wind_frames, args.wind_strength, windVariation, windChaos, args.sides, leaves))
+
+    if not args.output.lower().endswith(".npz"):
+        writeMesh(args.output, [(verts, faceSizes, faceVerts)])
+        return
+
+    branches = {"branch_" + field: getattr(tree.data, field) for field in BranchArrays.FIELDS}
+    np.savez(args.output, parameters=json.dumps(dict(parameters, seed=args.seed)), verts=verts.astype(np.float32), faceSizes=faceSizes, faceVerts=faceVerts, **branches)
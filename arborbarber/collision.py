@@ -0,0 +1,255 @@
+"""Branch collision pruning during growth.
+
+Each generation, every existing branch and every newly drawn one is sampled at points along
+its length and the points are hashed into a uniform grid. A new branch only has to be checked
+against the branches sharing a grid cell neighbourhood with it, so the cost grows with the
+number of branches rather than its square.
+"""
+
+import numpy as np
+
+# offsets of a cell and its 26 neighbours
+NEIGHBOURS = np.stack(np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1], indexing="ij"), axis=-1).reshape(-1, 3)
+CELL_BITS = 21
+CELL_OFFSET = 1 << (CELL_BITS - 1)
+# shortened branches keeping less than this fraction of their length are dropped instead
+MIN_SHORTENED = 0.25
+SHORTEN_PASSES = 3
+# grid cells are this many clearances wide, unless that takes more samples per segment than allowed
+CELL_CLEARANCES = 4
+MAX_SEGMENT_SAMPLES = 256
+# new branches looked up in the grid at a time, which bounds the memory candidate pairs take
+QUERY_CHUNK = 8192
+
+
+def cellKeys(cells):
+    """Pack (n, 3) integer cell coordinates into one int64 key each."""
+    cells = cells.astype(np.int64) + CELL_OFFSET
+    return (cells[..., 0] << (2 * CELL_BITS)) | (cells[..., 1] << CELL_BITS) | cells[..., 2]
+
+def sortedUnique(values):
+    """Return the distinct values in ascending order, by sorting, which is faster than hashing them."""
+    values = np.sort(values)
+    unique = np.ones(len(values), dtype=bool)
+    unique[1:] = values[1:] != values[:-1]
+    return values[unique]
+
+def segmentDistances(begins, ends, otherBegins, otherEnds):
+    """Return the closest distance between each pair of segments and where along the first
+    segment, as a fraction of its length, the closest point lies.
+    :returns: distances and fractions, shape (n,) each
+    :rtype: tuple
+    """
+    d1 = ends - begins
+    d2 = otherEnds - otherBegins
+    r = begins - otherBegins
+    a = np.maximum(np.einsum("ij,ij->i", d1, d1), 1e-18)
+    e = np.einsum("ij,ij->i", d2, d2)
+    b = np.einsum("ij,ij->i", d1, d2)
+    c = np.einsum("ij,ij->i", d1, r)
+    f = np.einsum("ij,ij->i", d2, r)
+
+    # closest points of the infinite lines, then clamped onto both segments
+    denominator = a * e - b * b
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = np.where(denominator > 1e-12 * a * np.maximum(e, 1e-18), np.clip((b * f - c * e) / denominator, 0, 1), 0)
+        t = np.where(e > 1e-18, (b * s + f) / e, 0)
+    s = np.where(t < 0, np.clip(-c / a, 0, 1), np.where(t > 1, np.clip((b - c) / a, 0, 1), s))
+    t = np.clip(t, 0, 1)
+    gaps = r + d1 * s[:, None] - d2 * t[:, None]
+    return np.sqrt(np.einsum("ij,ij->i", gaps, gaps)), s
+
+
+class SegmentGrid:
+    """Uniform hash grid of points sampled along segments.
+    Points are spaced so that any two segments closer than reach have samples in neighbouring
+    cells; candidates can then over-report pairs, but never miss one.
+    :param begins: segment start points, shape (n, 3)
+    :type begins: numpy.ndarray
+    :param ends: segment end points, shape (n, 3)
+    :type ends: numpy.ndarray
+    :param reach: distance within which pairs must be found
+    :type reach: float
+    :param cellSize: edge of a grid cell, raised to twice reach if smaller, or to what keeps the
+        longest segment within MAX_SEGMENT_SAMPLES samples
+    :type cellSize: float
+    """
+
+    def __init__(self, begins, ends, reach, cellSize):
+        longest = np.linalg.norm(ends - begins, axis=1).max() if len(begins) else 0
+        self.cellSize = max(cellSize, 2 * reach, longest / (MAX_SEGMENT_SAMPLES - 1) + reach)
+        self.spacing = self.cellSize - reach
+        cells, owners = self.sampleCells(begins, ends)
+        keys = cellKeys(cells)
+        # a segment is listed once per cell however many of its samples fall into it
+        self.keys = sortedUnique(keys)
+        pairs = sortedUnique(np.searchsorted(self.keys, keys) * len(begins) + owners)
+        self.owners = pairs % len(begins)
+        self.starts = np.searchsorted(pairs // len(begins), np.arange(len(self.keys) + 1))
+
+    def sampleCells(self, begins, ends):
+        """Return the cell of every sample point along the segments, and the segment it belongs to."""
+        lengths = np.linalg.norm(ends - begins, axis=1)
+        counts = np.ceil(lengths / self.spacing).astype(np.int64) + 1
+        owners = np.repeat(np.arange(len(begins)), counts)
+        steps = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        fractions = steps / np.repeat(np.maximum(counts - 1, 1), counts)
+        points = begins[owners] + (ends - begins)[owners] * fractions[:, None]
+        return np.floor(points / self.cellSize).astype(np.int64), owners
+
+    def candidates(self, begins, ends):
+        """Return every pair of a query segment and a grid segment that may be closer than reach.
+        :returns: query indices and grid segment indices, each pair once, sorted by query
+        :rtype: tuple
+        """
+        cells, queries = self.sampleCells(begins, ends)
+        cellCount = len(self.keys)
+        # neighbouring samples of a segment mostly share a cell
+        distinct = np.ones(len(cells), dtype=bool)
+        distinct[1:] = np.any(cells[1:] != cells[:-1], axis=1) | (queries[1:] != queries[:-1])
+        cells = cells[distinct]
+        queries = queries[distinct]
+        # distinct non-empty cells around each query
+        keys = cellKeys(cells[:, None, :] + NEIGHBOURS).ravel()
+        cellIds = np.minimum(np.searchsorted(self.keys, keys), cellCount - 1)
+        found = self.keys[cellIds] == keys
+        queryCells = sortedUnique(np.repeat(queries, len(NEIGHBOURS))[found] * cellCount + cellIds[found])
+        queries = queryCells // cellCount
+        cellIds = queryCells % cellCount
+
+        starts = self.starts[cellIds]
+        counts = self.starts[cellIds + 1] - starts
+        positions = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+        segmentCount = int(self.owners.max()) + 1 if len(self.owners) else 1
+        pairs = sortedUnique(np.repeat(queries, counts) * segmentCount + self.owners[positions])
+        return pairs // segmentCount, pairs % segmentCount
+
+
+def cutEnds(begins, ends, fractions):
+    """Return the ends of segments cut to a fraction of their length; uncut segments keep their ends exactly."""
+    return np.where((fractions < 1)[:, None], begins + (ends - begins) * fractions[:, None], ends)
+
+def shortenBranches(begins, ends, fractions, queries, otherBegins, otherEnds, clearance, passes):
+    """Shorten branches in place to end clearance short of the segments they pass too close to.
+    :param begins: branch start points, shape (m, 3)
+    :type begins: numpy.ndarray
+    :param ends: branch end points as drawn, shape (m, 3)
+    :type ends: numpy.ndarray
+    :param fractions: fraction of its length each branch keeps, updated in place
+    :type fractions: numpy.ndarray
+    :param queries: branch index of each pair to check
+    :type queries: numpy.ndarray
+    :param otherBegins: start point of the other segment of each pair
+    :type otherBegins: numpy.ndarray
+    :param otherEnds: end point of the other segment of each pair
+    :type otherEnds: numpy.ndarray
+    :param clearance: smallest distance allowed between segments
+    :type clearance: float
+    :param passes: number of times to shorten, 0 to only detect collisions
+    :type passes: int
+    :returns: which branches still collide
+    :rtype: numpy.ndarray
+    """
+    colliding = np.zeros(len(begins), dtype=bool)
+    for step in range(passes + 1):
+        queryBegins = begins[queries]
+        queryDirs = ends[queries] - queryBegins
+        distances, along = segmentDistances(queryBegins, queryBegins + queryDirs * fractions[queries, None], otherBegins, otherEnds)
+        hits = distances < clearance
+        colliding[:] = False
+        colliding[queries[hits]] = True
+        if step == passes or not hits.any():
+            break
+        # end a clearance short of the closest approach
+        hitQueries = queries[hits]
+        cuts = fractions[hitQueries] * along[hits] - clearance / np.maximum(np.linalg.norm(queryDirs[hits], axis=1), 1e-18)
+        np.minimum.at(fractions, hitQueries, np.maximum(cuts, 0))
+        # shortening only removes collisions, so only the shortened branches need checking again
+        recheck = colliding[queries]
+        queries = queries[recheck]
+        otherBegins = otherBegins[recheck]
+        otherEnds = otherEnds[recheck]
+    return colliding
+
+def collisionCuts(begins, ends, parents, newBegins, newEnds, newParents, clearance, shorten=True):
+    """Decide which newly drawn branches to keep, and how much of each, so none passes within
+    clearance of the existing branches or of the new branches drawn before it.
+    New branches are settled in order: each is only tested against what is left of the earlier
+    ones once those are shortened or dropped, as if they were grown one at a time.
+    Branches are never tested against their parent or their siblings, which they touch.
+    :param begins: start points of the existing branches, shape (n, 3)
+    :type begins: numpy.ndarray
+    :param ends: end points of the existing branches, shape (n, 3)
+    :type ends: numpy.ndarray
+    :param parents: parent index of each existing branch, -1 for none
+    :type parents: numpy.ndarray
+    :param newBegins: start points of the new branches, shape (m, 3)
+    :type newBegins: numpy.ndarray
+    :param newEnds: end points of the new branches as drawn, shape (m, 3)
+    :type newEnds: numpy.ndarray
+    :param newParents: index of each new branch's parent among the existing ones
+    :type newParents: numpy.ndarray
+    :param clearance: smallest distance allowed between branches
+    :type clearance: float
+    :param shorten: shorten colliding branches to end before the collision instead of dropping them
+    :type shorten: bool
+    :returns: which new branches to keep, and the fraction of its length each keeps
+    :rtype: tuple
+    """
+    count = len(begins)
+    allBegins = np.concatenate((begins, newBegins))
+    allEnds = np.concatenate((ends, newEnds))
+    allParents = np.concatenate((parents, newParents))
+    grid = SegmentGrid(allBegins, allEnds, clearance, CELL_CLEARANCES * clearance)
+    chunkQueries = []
+    chunkOthers = []
+    for first in range(0, len(newBegins), QUERY_CHUNK):
+        queries, others = grid.candidates(newBegins[first:first + QUERY_CHUNK], newEnds[first:first + QUERY_CHUNK])
+        queries += first
+        # earlier new branches win, so only later ones are checked against them
+        isNew = others >= count
+        valid = (others != newParents[queries]) & ~(isNew & ((allParents[others] == newParents[queries]) | (others - count >= queries)))
+        queries = queries[valid]
+        others = others[valid]
+        # a shortened branch lies within its full length, so pairs apart at full length stay apart
+        distances, _ = segmentDistances(newBegins[queries], newEnds[queries], allBegins[others], allEnds[others])
+        touching = distances < clearance
+        chunkQueries.append(queries[touching])
+        chunkOthers.append(others[touching])
+    queries = np.concatenate(chunkQueries) if chunkQueries else np.zeros(0, dtype=np.int64)
+    others = np.concatenate(chunkOthers) if chunkOthers else np.zeros(0, dtype=np.int64)
+    # a new branch has to wait for the earlier ones it touches
+    waitQueries = queries[others >= count]
+    waitOthers = others[others >= count] - count
+
+    fractions = np.ones(len(newBegins))
+    keep = np.ones(len(newBegins), dtype=bool)
+    decided = np.zeros(len(newBegins), dtype=bool)
+    passes = SHORTEN_PASSES if shorten else 0
+    while not decided.all():
+        # the earliest undecided branch never waits, so every round settles at least one
+        waiting = np.zeros(len(newBegins), dtype=bool)
+        waiting[waitQueries[~decided[waitOthers]]] = True
+        ready = ~decided & ~waiting
+
+        # earlier new branches count as what is left of them, and not at all once dropped
+        selected = ready[queries]
+        isNew = others >= count
+        selected[isNew] &= keep[others[isNew] - count]
+        pairQueries = queries[selected]
+        pairOthers = others[selected]
+        otherEnds = allEnds[pairOthers]
+        isNew = pairOthers >= count
+        earlier = pairOthers[isNew] - count
+        otherEnds[isNew] = cutEnds(newBegins[earlier], newEnds[earlier], fractions[earlier])
+        colliding = shortenBranches(newBegins, newEnds, fractions, pairQueries, allBegins[pairOthers], otherEnds, clearance, passes)
+        keep[ready] = ~colliding[ready] & (fractions[ready] >= MIN_SHORTENED)
+        decided |= ready
+
+        live = ~decided[queries]
+        queries = queries[live]
+        others = others[live]
+        live = ~decided[waitQueries]
+        waitQueries = waitQueries[live]
+        waitOthers = waitOthers[live]
+    return keep, fractions
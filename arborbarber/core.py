@@ -0,0 +1,821 @@
+"""Tree generation core: noise, rotation, growth and wind, using only NumPy and the standard library."""
+
+from math import pi, cos, radians
+import numpy as np
+import random
+
+from .collision import collisionCuts, cutEnds
+from .profiling import stage
+from .thinning import thinLeaves
+
+tree = None
+seed = random.randint(0, 100)
+numFrames = 0
+
+# initial values of tree
+trunkLen = 2
+trunkWidth = 8
+minBranchingSize = 0.5 
+maxBranchingSize = 0.9
+minNumBranch = 2
+maxNumBranch = 4
+minSplitAngle = pi/12
+maxSplitAngle = pi/4
+maxLevel = 6
+
+windStrength = 0
+windVariation = 0
+windChaos = 0
+
+# Perlin noise function pasted from p5py
+
+PERLIN_OCTAVES = 4
+
+# P: 50% redution per octave
+PERLIN_FALLOFF = 0.5
+
+PERLIN_YWRAPB = 4
+PERLIN_YWRAP = 1 << PERLIN_YWRAPB
+PERLIN_ZWRAPB = 8
+PERLIN_ZWRAP = 1 << PERLIN_ZWRAPB
+PERLIN_SIZE = 4095
+
+# P: [toxi 031112]
+# P: new vars needed due to recent change of cos table in PGraphics
+PERLIN_COS_TABLE = np.array([cos(radians(d) * 0.5) for d in range(720)])
+PERLIN_TWO_PI = 720
+PERLIN_PI = PERLIN_TWO_PI
+PERLIN_PI >>= 1
+
+PERLIN = None
+
+
+def perlinTable():
+    """Return the Perlin permutation table, filling it from the random module on first use.
+    :returns: The table of PERLIN_SIZE + 1 random values.
+    :rtype: numpy.ndarray
+    """
+
+    global PERLIN
+    if PERLIN is None:
+        PERLIN = np.array([random.random() for _ in range(PERLIN_SIZE + 1)])
+    return PERLIN
+
+
+def noiseArray(x, y=0, z=0):
+    """Return perlin noise values at many locations at once.
+    Matches noise() bit for bit; inputs are broadcast against each other.
+    :param x: x-coordinates in noise space.
+    :type x: array_like
+    :param y: y-coordinates in noise space.
+    :type y: array_like
+    :param z: z-coordinates in noise space.
+    :type z: array_like
+    :returns: The perlin noise values.
+    :rtype: numpy.ndarray
+    """
+
+    table = perlinTable()
+
+    def noise_fsc(i):
+
+        return 0.5 * (1 - PERLIN_COS_TABLE[(i * PERLIN_PI).astype(np.int64) % PERLIN_TWO_PI])
+
+    x, y, z = np.broadcast_arrays(np.abs(np.asarray(x, dtype=np.float64)),
+                                  np.abs(np.asarray(y, dtype=np.float64)),
+                                  np.abs(np.asarray(z, dtype=np.float64)))
+
+    xi = x.astype(np.int64)
+    xf = x - xi
+
+    yi = y.astype(np.int64)
+    yf = y - yi
+
+    zi = z.astype(np.int64)
+    zf = z - zi
+
+    r = np.zeros(x.shape)
+    ampl = 0.5
+
+    for i in range(PERLIN_OCTAVES):
+        rxf = noise_fsc(xf)
+        ryf = noise_fsc(yf)
+
+        of = xi + (yi << PERLIN_YWRAPB) + (zi << PERLIN_ZWRAPB)
+        n1 = table[of % PERLIN_SIZE]
+        n1 += rxf * (table[(of + 1) % PERLIN_SIZE] - n1)
+        n2 = table[(of + PERLIN_YWRAP) % PERLIN_SIZE]
+        n2 += rxf * (table[(of + PERLIN_YWRAP + 1) & PERLIN_SIZE] - n2)
+        n1 += ryf * (n2 - n1)
+
+        of += PERLIN_ZWRAP
+        n2 = table[of & PERLIN_SIZE]
+        n2 += rxf * (table[(of + 1) % PERLIN_SIZE] - n2)
+        n3 = table[(of + PERLIN_YWRAP) % PERLIN_SIZE]
+        n3 += rxf * (table[(of + PERLIN_YWRAP + 1) % PERLIN_SIZE] - n3)
+
+        n2 += ryf * (n3 - n2)
+        n1 += noise_fsc(zf) * (n2 - n1)
+
+        r += n1 * ampl
+        ampl *= PERLIN_FALLOFF
+
+        xi *= 2
+        xf *= 2
+
+        yi *= 2
+        yf *= 2
+
+        zi *= 2
+        zf *= 2
+
+        wrap = xf >= 1
+        xi += wrap
+        xf -= wrap
+
+        wrap = yf >= 1
+        yi += wrap
+        yf -= wrap
+
+        wrap = zf >= 1
+        zi += wrap
+        zf -= wrap
+
+    return r
+
+
+def noise(x, y=0, z=0):
+    """Return perlin noise value at the given location.
+    :param x: x-coordinate in noise space.
+    :type x: float
+    :param y: y-coordinate in noise space.
+    :type y: float
+    :param z: z-coordinate in noise space.
+    :type z: float
+    :returns: The perlin noise value.
+    :rtype: float
+    """
+
+    return float(noiseArray(x, y, z))
+
+# Rodriguez' rotation formula
+def rotateAround(vect, axis, angle):
+    """Return rotation around a vector for a given axis and angle.
+    :param vect: vector to rotate around
+    :type vect: numpy.ndarray
+    :param axis: axis to rotate
+    :type axis: numpy.ndarray
+    :param angle: angle to rotate
+    :type angle: float
+    :returns: the rotated vector
+    :rtype: numpy.ndarray
+    """
+    vects = np.asarray(vect, dtype=np.float64).reshape(1, 3)
+    axes = np.asarray(axis, dtype=np.float64).reshape(1, 3)
+    return rotateAroundMany(vects, axes, angle)[0]
+
+def rowDots(a, b):
+    """Return the dot product of each pair of rows of two (n, 3) arrays.
+    Each product is summed exactly as np.dot sums a single pair, which the BLAS may do with fused
+    multiply-adds, so batched results match per-vector code bit for bit.
+    """
+    return np.matmul(a[:, None, :], b[:, :, None]).reshape(-1)
+
+def rotateAroundMany(vects, axes, angles, out=None, work=None):
+    """Return each row of vects rotated around the matching row of axes.
+    No (n, 3) temporaries are allocated when both buffers are supplied.
+    :param vects: vectors to rotate, shape (n, 3)
+    :type vects: numpy.ndarray
+    :param axes: rotation axes, shape (n, 3), need not be normalized
+    :type axes: numpy.ndarray
+    :param angles: rotation angles, shape (n,) or a scalar
+    :type angles: array_like
+    :param out: optional (n, 3) float buffer for the result; must not be vects
+    :type out: numpy.ndarray
+    :param work: optional (n, 3) float scratch buffer; may be axes itself, which is then overwritten
+    :type work: numpy.ndarray
+    :returns: rotated vectors, shape (n, 3)
+    :rtype: numpy.ndarray
+    """
+    count = len(vects)
+    if out is None:
+        out = np.empty((count, 3))
+    if work is None:
+        work = np.empty((count, 3))
+    angles = np.broadcast_to(np.asarray(angles, dtype=np.float64), (count,))
+    cosAngles = np.cos(angles)
+    sinAngles = np.sin(angles)
+
+    # unit axes
+    np.divide(axes, np.sqrt(rowDots(axes, axes))[:, None], out=work)
+    projections = rowDots(work, vects) * (1 - cosAngles)
+
+    # cross(axis, vect) * sin + vect * cos
+    for i, j, k in ((0, 1, 2), (1, 2, 0), (2, 0, 1)):
+        np.multiply(work[:, j], vects[:, k], out=out[:, i])
+        out[:, i] -= work[:, k] * vects[:, j]
+    out *= sinAngles[:, None]
+    for i in range(3):
+        out[:, i] += vects[:, i] * cosAngles
+
+    # axis * (axis . vect) * (1 - cos)
+    work *= projections[:, None]
+    out += work
+    return out
+
+# from Arduino reference
+def remap(x, in_min, in_max, out_min, out_max):
+    return (x - in_min) * (out_max - out_min) / (in_max - in_min) + out_min
+
+# counter-based randomness: every value is a hash of a branch's key and a draw number, and a
+# child's key is a hash of its parent's key and its child number, so nothing depends on order
+KEY_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+KEY_DRAW_SALT = np.uint64(0xD1B54A32D192ED03)
+
+def mixBits(x):
+    """Return the SplitMix64 finalizer of each uint64 in x."""
+    x = np.asarray(x, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def rootKey(seed):
+    """Return the key of a tree's trunk for a tree seed."""
+    return mixBits(np.uint64(seed & 0xFFFFFFFFFFFFFFFF) ^ KEY_GOLDEN)
+
+def childKeys(keys, childNumbers):
+    """Return the keys of children from their parents' keys and their index among siblings."""
+    with np.errstate(over="ignore"):
+        return mixBits(np.asarray(keys, dtype=np.uint64) + (np.asarray(childNumbers, dtype=np.uint64) + np.uint64(1)) * KEY_GOLDEN)
+
+def counterUniform(keys, draw):
+    """Return the uniform [0, 1) value number draw of each key."""
+    with np.errstate(over="ignore"):
+        bits = mixBits(np.asarray(keys, dtype=np.uint64) ^ mixBits(np.uint64(draw) * KEY_GOLDEN + KEY_DRAW_SALT))
+    return (bits >> np.uint64(11)) * 2.0**-53
+
+def defaultParameters():
+    """Return the initial tree values as keyword arguments for Tree."""
+    return dict(trunkLen=trunkLen, trunkWidth=trunkWidth, minBranchingSize=minBranchingSize, maxBranchingSize=maxBranchingSize, minNumBranch=minNumBranch, maxNumBranch=maxNumBranch, minSplitAngle=minSplitAngle, maxSplitAngle=maxSplitAngle, maxLevel=maxLevel)
+
+def generateTree(seed, **parameters):
+    """Seed the random module, then grow a tree all the way to its leaves.
+    The random module is left where growing from it directly would have left it, so anything
+    seeded from it afterwards, such as the noise table, is the same as it always was.
+    :param seed: tree seed
+    :type seed: int
+    :param parameters: keyword arguments for Tree
+    :returns: the grown tree
+    :rtype: Tree
+    """
+    random.seed(seed)
+    tree = Tree(**parameters)
+    while not tree.hasLeaves:
+        tree.grow()
+    if tree.random is not None:
+        random.setstate(tree.random.getstate())
+    return tree
+
+def generateTreeDefault():
+    global tree
+    tree = generateTree(seed, **defaultParameters())
+
+class BranchArrays:
+    """Structure-of-arrays storage for every branch of a tree.
+    Row i of each array describes branch i; branches are stored in growth order, so a
+    parent always comes before its children and each level is a contiguous run.
+    """
+
+    FIELDS = ("begin", "end", "endStill", "endWind", "level", "parent", "thickness", "randomOffset", "hasBranches", "key")
+
+    def __init__(self):
+        self.begin = np.zeros((0, 3))
+        self.end = np.zeros((0, 3))
+        self.endStill = np.zeros((0, 3))
+        self.endWind = np.zeros((0, 3))
+        self.level = np.zeros(0, dtype=np.int32)
+        self.parent = np.zeros(0, dtype=np.int64) # -1 for the trunk
+        self.thickness = np.zeros(0)
+        self.randomOffset = np.zeros(0)
+        self.hasBranches = np.zeros(0, dtype=bool)
+        self.key = np.zeros(0, dtype=np.uint64) # counter-mode random key, 0 in other modes
+        # deepest level grown so far; collision pruning can leave it without any branches
+        self.growthLevel = 0
+
+    def __len__(self):
+        return len(self.level)
+
+    @property
+    def nbytes(self):
+        """Total size of the branch arrays in bytes."""
+        return sum(getattr(self, field).nbytes for field in self.FIELDS)
+
+    @classmethod
+    def fromFields(cls, fields, growthLevel=None):
+        """Wrap existing arrays, such as memory-mapped ones, without copying them.
+        :param fields: array for every name in FIELDS
+        :type fields: dict
+        :param growthLevel: deepest level grown, by default the deepest level with branches
+        :type growthLevel: int
+        :rtype: BranchArrays
+        """
+        data = cls()
+        for field in cls.FIELDS:
+            setattr(data, field, fields[field])
+        if growthLevel is None:
+            growthLevel = int(data.level.max()) if len(data) else 0
+        data.growthLevel = int(growthLevel)
+        return data
+
+    def append(self, begin, end, level, parent, maxWidth, randomOffset, key=0):
+        """Append a batch of branches and return the index of the first one.
+        :param begin: start points, shape (n, 3)
+        :type begin: numpy.ndarray
+        :param end: end points, shape (n, 3)
+        :type end: numpy.ndarray
+        :param level: level of each new branch
+        :type level: array_like
+        :param parent: index of each new branch's parent, -1 for none
+        :type parent: array_like
+        :param maxWidth: trunk width the thickness is remapped from
+        :type maxWidth: float
+        :param randomOffset: per-branch rustle noise offset
+        :type randomOffset: array_like
+        :param key: counter-mode random key of each new branch
+        :type key: array_like
+        :returns: index of the first appended branch
+        :rtype: int
+        """
+        first = len(self)
+        end = np.asarray(end, dtype=np.float64).reshape(-1, 3)
+        count = len(end)
+        level = np.broadcast_to(np.asarray(level, dtype=np.int32), (count,))
+
+        self.begin = np.concatenate((self.begin, np.asarray(begin, dtype=np.float64).reshape(-1, 3)))
+        self.end = np.concatenate((self.end, end))
+        self.endStill = np.concatenate((self.endStill, end))
+        self.endWind = np.concatenate((self.endWind, end))
+        self.level = np.concatenate((self.level, level))
+        self.parent = np.concatenate((self.parent, np.broadcast_to(np.asarray(parent, dtype=np.int64), (count,))))
+        self.thickness = np.concatenate((self.thickness, np.maximum(remap(level, 0, 5, maxWidth, 1), 1)))
+        self.randomOffset = np.concatenate((self.randomOffset, np.broadcast_to(np.asarray(randomOffset, dtype=np.float64), (count,))))
+        self.hasBranches = np.concatenate((self.hasBranches, np.zeros(count, dtype=bool)))
+        self.key = np.concatenate((self.key, np.broadcast_to(np.asarray(key, dtype=np.uint64), (count,))))
+        return first
+
+    def truncate(self, count):
+        """Keep only the first count branches, copying so the larger arrays can be freed."""
+        for field in self.FIELDS:
+            setattr(self, field, getattr(self, field)[:count].copy())
+
+    def syncBegins(self):
+        """Move every branch's begin onto its parent's (possibly displaced) end."""
+        children = self.parent >= 0
+        self.begin[children] = self.end[self.parent[children]]
+
+
+class Branch:
+    """Thin view of one row of a tree's BranchArrays."""
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, Branch) and other.tree is self.tree and other.index == self.index
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index))
+
+    @property
+    def begin(self):
+        return self.tree.data.begin[self.index]
+
+    @property
+    def end(self):
+        return self.tree.data.end[self.index]
+
+    @property
+    def endStill(self):
+        return self.tree.data.endStill[self.index]
+
+    @property
+    def endWind(self):
+        return self.tree.data.endWind[self.index]
+
+    @property
+    def level(self):
+        return int(self.tree.data.level[self.index])
+
+    @property
+    def maxWidth(self):
+        return self.tree.trunkWidth
+
+    @property
+    def thickness(self):
+        return float(self.tree.data.thickness[self.index])
+
+    @property
+    def randomOffset(self):
+        return float(self.tree.data.randomOffset[self.index])
+
+    @property
+    def hasBranches(self):
+        return bool(self.tree.data.hasBranches[self.index])
+
+    @property
+    def parent(self):
+        parent = self.tree.data.parent[self.index]
+        return None if parent < 0 else Branch(self.tree, int(parent))
+
+    @property
+    def leaves(self):
+        if self.tree.hasLeaves and not self.hasBranches:
+            return [self.end]
+        return []
+
+
+class BranchList:
+    """Read-only sequence of Branch views over a tree's arrays."""
+
+    def __init__(self, tree):
+        self.tree = tree
+
+    def __len__(self):
+        return len(self.tree.data)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Branch(self.tree, i) for i in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("branch index out of range")
+        return Branch(self.tree, index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield Branch(self.tree, i)
+
+
+GROWTH_MODES = ("compatible", "vectorized", "counter")
+COLLISION_MODES = ("shorten", "reject")
+
+class Tree:
+    def __init__(self, trunkLen, trunkWidth, minBranchingSize, maxBranchingSize, minNumBranch, maxNumBranch, minSplitAngle, maxSplitAngle, maxLevel, growthMode="compatible", clearance=0, collisionMode="shorten", leafSpacing=0, leafCount=0, leafDensity=0, seed=None, data=None):
+        self.trunkLen = trunkLen # inital length of trunk
+        self.trunkWidth = trunkWidth # inital width of trunk
+        self.minSize = minBranchingSize # min/max branching size multiplier
+        self.maxSize = maxBranchingSize
+        self.minNumBranch = minNumBranch # min/max number of branches per
+        self.maxNumBranch = maxNumBranch
+        self.minSplitAngle = minSplitAngle # min/max angle of branch split
+        self.maxSplitAngle = maxSplitAngle
+        self.maxLevel = maxLevel # max num of branches before no more growth
+
+        # "compatible" draws from the random module in the original per-branch order and
+        # reproduces the trees of earlier versions; "vectorized" samples each level at once;
+        # "counter" hashes each value from the seed and the branch's path, independent of order
+        if growthMode not in GROWTH_MODES:
+            raise ValueError("unknown growth mode: %r" % (growthMode,))
+        self.growthMode = growthMode
+        # new branches passing within clearance of others are shortened or dropped; 0 disables the check
+        if collisionMode not in COLLISION_MODES:
+            raise ValueError("unknown collision mode: %r" % (collisionMode,))
+        self.clearance = clearance
+        self.collisionMode = collisionMode
+        # leaves closer than leafSpacing to a kept one are thinned out, then more until about
+        # leafCount leaves, or leafDensity per unit volume, remain; 0 disables each
+        self.leafSpacing = leafSpacing
+        self.leafCount = leafCount
+        self.leafDensity = leafDensity
+        self.rng = None
+        # compatible growth draws from its own copy of the random module's state, so other
+        # threads seeding or drawing from the module can't change the tree
+        self.random = None
+        if growthMode == "compatible":
+            self.random = random.Random()
+            self.random.setstate(random.getstate())
+        self.branches = BranchList(self)
+        self.leafIndices = np.zeros(0, dtype=np.int64)
+        self.hasLeaves = False
+
+        # an existing BranchArrays, e.g. grown in another process, is adopted without drawing anything
+        if data is not None:
+            self.data = data
+            if growthMode == "vectorized" and seed is not None:
+                self.rng = np.random.default_rng(seed)
+            self.levelStates = []
+            self.timeOffset = 0
+            return
+
+        if growthMode != "compatible" and seed is None:
+            seed = random.getrandbits(64)
+        if growthMode == "vectorized":
+            self.rng = np.random.default_rng(seed)
+
+        self.data = BranchArrays()
+        rootBegin = np.array([0, 0, 0])
+        rootEnd = np.array([0, -self.trunkLen, 0])
+        rootOffset = 0 if growthMode != "compatible" else self.random.uniform(0, 1.5) * 0 * 1000
+        self.data.append(rootBegin, rootEnd, 0, -1, trunkWidth, rootOffset, rootKey(seed) if growthMode == "counter" else 0)
+        self.growthLevel = 0
+        # random state before growing each level, so growth can resume after pruning or later on
+        self.levelStates = [self.randomState()]
+
+        self.timeOffset = 0
+
+    def parameters(self):
+        """Return the keyword arguments this tree was created with, without seed or data."""
+        return dict(trunkLen=self.trunkLen, trunkWidth=self.trunkWidth, minBranchingSize=self.minSize, maxBranchingSize=self.maxSize, minNumBranch=self.minNumBranch, maxNumBranch=self.maxNumBranch, minSplitAngle=self.minSplitAngle, maxSplitAngle=self.maxSplitAngle, maxLevel=self.maxLevel, growthMode=self.growthMode, clearance=self.clearance, collisionMode=self.collisionMode, leafSpacing=self.leafSpacing, leafCount=self.leafCount, leafDensity=self.leafDensity)
+
+    def subtree(self, index):
+        """Grow branch index and all of its descendants on their own, as a separate counter-mode tree.
+        Only the branch itself is read, so subtrees can be grown lazily or on other workers; the
+        result matches the descendants in the full tree.
+        :param index: index of the subtree's root branch
+        :type index: int
+        :returns: a tree whose branch 0 is the given branch
+        :rtype: Tree
+        """
+        if self.growthMode != "counter":
+            raise ValueError("subtrees can only be regrown in counter mode")
+        if self.clearance > 0 or self.thinsLeaves:
+            raise ValueError("subtrees can't be regrown with collision pruning or leaf thinning, which depend on the rest of the tree")
+        data = self.data
+        root = BranchArrays()
+        parent = data.parent[index]
+        begin = data.endStill[parent] if parent >= 0 else data.begin[index]
+        root.append(begin, data.endStill[index], data.level[index], -1, self.trunkWidth, data.randomOffset[index], data.key[index])
+        root.growthLevel = int(data.level[index])
+        tree = Tree(**self.parameters(), data=root)
+        while not tree.hasLeaves:
+            tree.grow()
+        return tree
+
+    @property
+    def growthLevel(self):
+        """Number of levels grown so far, stored with the branch arrays."""
+        return self.data.growthLevel
+
+    @growthLevel.setter
+    def growthLevel(self, level):
+        self.data.growthLevel = level
+
+    @property
+    def leaves(self):
+        """Current positions of the leaves, one row per terminal branch."""
+        return self.data.end[self.leafIndices]
+
+    def grow(self):
+        for _ in self.growChunks():
+            pass
+
+    def growChunks(self, chunkSize=None):
+        """Grow the next level, or the leaves, yielding after every chunkSize frontier branches so
+        callers can stop part way through a level. Children are appended chunk by chunk and each
+        chunk is pruned against the ones before it, so the tree is the same for any chunk size.
+        A tree left part way through a level must not be grown further.
+        :param chunkSize: frontier branches grown at a time, None for the whole level at once
+        :type chunkSize: int
+        """
+        if self.hasLeaves:
+            return
+        with stage("grow") as record:
+            if self.growthLevel == self.maxLevel:
+                self.growLeaves()
+                self.hasLeaves = True
+                record.count(leaves=len(self.leafIndices))
+                return
+
+            if self.growthLevel < len(self.levelStates):
+                self.setRandomState(self.levelStates[self.growthLevel])
+
+            # branches are visited last to first, as the original per-branch loop did
+            frontier = np.flatnonzero(~self.data.hasBranches & (self.data.level == self.growthLevel))[::-1]
+            before = len(self.data)
+            # collision pruning can drop a whole level, leaving nothing to grow from
+            if len(frontier):
+                if self.growthMode == "vectorized":
+                    samples = self.sampleVectorized(frontier)
+                elif self.growthMode == "counter":
+                    samples = self.sampleCounter(frontier)
+                else:
+                    samples = self.sampleCompatible(frontier)
+                # the whole level is drawn at once, so chunking can't change the draws
+                childStarts = np.concatenate(([0], np.cumsum(samples[0])))
+                chunkSize = chunkSize or len(frontier)
+                for start in range(0, len(frontier), chunkSize):
+                    stop = min(start + chunkSize, len(frontier))
+                    perBranch = [values[start:stop] for values in samples[:3]]
+                    perChild = [values[childStarts[start]:childStarts[stop]] for values in samples[3:]]
+                    self.growFrontier(frontier[start:stop], *perBranch, *perChild)
+                    if stop < len(frontier):
+                        yield
+            record.count(branches=len(self.data) - before)
+
+            self.growthLevel += 1
+            del self.levelStates[self.growthLevel:]
+            self.levelStates.append(self.randomState())
+
+    def randomState(self):
+        """Return the state of whichever generator this tree's growth mode draws from."""
+        if self.growthMode == "compatible":
+            return self.random.getstate()
+        if self.growthMode == "vectorized":
+            return self.rng.bit_generator.state
+        return None
+
+    def setRandomState(self, state):
+        if self.growthMode == "compatible":
+            self.random.setstate(state)
+        elif self.growthMode == "vectorized":
+            self.rng.bit_generator.state = state
+
+    def setMaxLevel(self, maxLevel):
+        """Regrow the tree to a different max level, keeping every level it already has.
+        Raising the level grows only the new generations and lowering it prunes by branch level;
+        either way the result is the tree a fresh generation with this max level would give.
+        :param maxLevel: new max level
+        :type maxLevel: int
+        """
+        if maxLevel == self.maxLevel and self.hasLeaves:
+            return
+        if maxLevel < self.growthLevel:
+            data = self.data
+            data.truncate(int(np.count_nonzero(data.level <= maxLevel)))
+            data.hasBranches[data.level == maxLevel] = False
+            self.growthLevel = maxLevel
+        self.maxLevel = maxLevel
+        self.hasLeaves = False
+        self.leafIndices = np.zeros(0, dtype=np.int64)
+        while not self.hasLeaves:
+            self.grow()
+
+    def sampleCompatible(self, frontier):
+        """Draw the split parameters of every frontier branch from the tree's copy of the random module.
+        Draws happen in exactly the order the per-branch implementation made them.
+        :returns: per-branch child counts, split angles and lengths, then per-child
+            rotation angles and random offsets
+        :rtype: tuple
+        """
+        count = len(frontier)
+        counts = np.zeros(count, dtype=np.int64)
+        splits = np.zeros(count)
+        lengths = np.zeros(count)
+        angles = []
+        offsets = []
+        level = self.growthLevel + 1
+        for j in range(count):
+            randNum = self.random.randint(self.minNumBranch, self.maxNumBranch)
+            splits[j] = self.random.uniform(self.maxSplitAngle, self.minSplitAngle)
+            lengths[j] = self.random.uniform(self.maxSize, self.minSize)
+
+            branchAngle = 2*pi/randNum
+            childAngles = np.arange(self.random.uniform(0, branchAngle), 2*pi, branchAngle)
+            counts[j] = len(childAngles)
+            angles.append(childAngles)
+            offsets.extend(self.random.uniform(0, 1.5) * level * 1000 for _ in range(counts[j]))
+
+        return counts, splits, lengths, np.concatenate(angles), np.array(offsets)
+
+    def sampleVectorized(self, frontier):
+        """Draw the split parameters of every frontier branch from the tree's NumPy generator.
+        :returns: same layout as sampleCompatible
+        :rtype: tuple
+        """
+        count = len(frontier)
+        counts = self.rng.integers(self.minNumBranch, self.maxNumBranch, size=count, endpoint=True)
+        splits = self.maxSplitAngle + (self.minSplitAngle - self.maxSplitAngle) * self.rng.random(count)
+        lengths = self.maxSize + (self.minSize - self.maxSize) * self.rng.random(count)
+
+        branchAngles = 2*pi / counts
+        starts = self.rng.random(count) * branchAngles
+        firstChild = np.cumsum(counts) - counts
+        childNumbers = np.arange(counts.sum()) - np.repeat(firstChild, counts)
+        angles = np.repeat(starts, counts) + childNumbers * np.repeat(branchAngles, counts)
+        offsets = self.rng.random(len(angles)) * 1.5 * (self.growthLevel + 1) * 1000
+
+        return counts, splits, lengths, angles, offsets
+
+    def sampleCounter(self, frontier):
+        """Derive the split parameters of every frontier branch from its key.
+        :returns: same layout as sampleCompatible, followed by the children's keys
+        :rtype: tuple
+        """
+        keys = self.data.key[frontier]
+        counts = self.minNumBranch + (counterUniform(keys, 0) * (self.maxNumBranch - self.minNumBranch + 1)).astype(np.int64)
+        splits = self.maxSplitAngle + (self.minSplitAngle - self.maxSplitAngle) * counterUniform(keys, 1)
+        lengths = self.maxSize + (self.minSize - self.maxSize) * counterUniform(keys, 2)
+
+        branchAngles = 2*pi / counts
+        starts = counterUniform(keys, 3) * branchAngles
+        firstChild = np.cumsum(counts) - counts
+        childNumbers = np.arange(counts.sum()) - np.repeat(firstChild, counts)
+        angles = np.repeat(starts, counts) + childNumbers * np.repeat(branchAngles, counts)
+        newKeys = childKeys(np.repeat(keys, counts), childNumbers)
+        offsets = counterUniform(newKeys, 4) * 1.5 * (self.growthLevel + 1) * 1000
+
+        return counts, splits, lengths, angles, offsets, newKeys
+
+    def growFrontier(self, frontier, counts, splits, lengths, angles, offsets, keys=0):
+        """Append one generation of children to the frontier branches in a single batch."""
+        data = self.data
+        # grows from the still pose, so wind applied before growth resumes has no effect
+        ends = data.endStill[frontier]
+        parents = data.parent[frontier]
+        begins = np.where((parents >= 0)[:, None], data.endStill[np.maximum(parents, 0)], data.begin[frontier])
+
+        # direction of each frontier branch
+        dirs = ends - begins
+
+        # finds perpendicular axis to each branch
+        initAxes = np.cross(np.array([1, 0, 0]), dirs)
+        # rotates around perpendicular axis to get split angle via Rodrigues' formula
+        firstBranchDirs = rotateAroundMany(dirs, initAxes, splits, work=initAxes)
+
+        # spins each child around the axis of its parent; the repeated axes double as scratch space
+        childAxes = np.repeat(dirs, counts, axis=0)
+        branchDirs = rotateAroundMany(np.repeat(firstBranchDirs, counts, axis=0), childAxes, angles, work=childAxes)
+        branchDirs *= np.repeat(lengths, counts)[:, None]
+
+        childBegins = np.repeat(ends, counts, axis=0)
+        childEnds = childBegins + branchDirs
+        childParents = np.repeat(frontier, counts)
+        if self.clearance > 0:
+            stillBegins = np.where((data.parent >= 0)[:, None], data.endStill[np.maximum(data.parent, 0)], data.begin)
+            keep, fractions = collisionCuts(stillBegins, data.endStill, data.parent, childBegins, childEnds, childParents, self.clearance, self.collisionMode == "shorten")
+            # frontier branches left without children stay terminal and carry leaves
+            childBegins, childEnds, childParents = childBegins[keep], cutEnds(childBegins[keep], childEnds[keep], fractions[keep]), childParents[keep]
+            offsets = offsets[keep]
+            keys = np.broadcast_to(keys, keep.shape)[keep]
+        data.append(childBegins, childEnds, self.growthLevel + 1, childParents, self.trunkWidth, offsets, keys)
+        data.hasBranches[childParents] = True
+
+    @property
+    def thinsLeaves(self):
+        return self.leafSpacing > 0 or self.leafCount > 0 or self.leafDensity > 0
+
+    def growLeaves(self):
+        leafIndices = np.flatnonzero(~self.data.hasBranches)
+        if self.thinsLeaves:
+            # thinned from the still pose, so wind never changes which leaves are kept
+            leafIndices = leafIndices[thinLeaves(self.data.endStill[leafIndices], self.leafSpacing, self.leafCount, self.leafDensity)]
+        self.leafIndices = leafIndices
+
+    def rustle(self, strength, speed):
+        data = self.data
+        with stage("rustle") as record:
+            t = self.timeOffset * speed + data.randomOffset
+            noiseValues = noiseArray(np.concatenate((t, t + 100)))
+            movementsY = strength * (noiseValues[:len(t)] - 0.5)
+            movementsX = strength * (noiseValues[len(t):] - 0.5)
+            data.end[:, 1] = data.endStill[:, 1] + movementsY * (data.level + 1)
+            data.end[:, 0] = data.endWind[:, 0] + movementsX * (data.level + 1)
+            data.syncBegins()
+            record.count(branches=len(data), noiseSamples=2 * len(t))
+
+    def applyWind(self, strength, variation, chaos):
+        data = self.data
+        with stage("wind") as record:
+            noiseValues = noiseArray(self.timeOffset*chaos + data.level / 100)
+            movements = remap(variation, 0, 1, 0.5, noiseValues) * strength
+            data.end[:, 0] = data.endStill[:, 0] + movements * (data.level + 1)
+            data.endWind[:] = data.end
+
+            distFromStill = abs(data.end[-1, 0] - data.endStill[-1, 0])
+            rustleValue = min(remap(distFromStill, 0, 150, 0.05, 0.2), 2)
+            self.rustle(rustleValue * (1 + chaos), rustleValue * 2)
+            record.count(branches=len(data), noiseSamples=len(data))
+
+    def windEnds(self, times, strength, variation, chaos):
+        """Return the branch ends applyWind would give at each of several time offsets, all at once.
+        The tree itself is left untouched.
+        :param times: time offset of each frame
+        :type times: array_like
+        :returns: float (frames, n, 3) branch ends
+        :rtype: numpy.ndarray
+        """
+        data = self.data
+        times = np.asarray(times, dtype=np.float64)[:, None]
+        growth = data.level + 1
+        movements = remap(variation, 0, 1, 0.5, noiseArray(times*chaos + data.level / 100)) * strength
+        windX = data.endStill[:, 0] + movements * growth
+
+        distFromStill = np.abs(windX[:, -1] - data.endStill[-1, 0])
+        rustleValues = np.minimum(remap(distFromStill, 0, 150, 0.05, 0.2), 2)[:, None]
+        t = times * (rustleValues * 2) + data.randomOffset
+        noiseValues = noiseArray(np.concatenate((t, t + 100), axis=1))
+        movementsY = rustleValues * (1 + chaos) * (noiseValues[:, :len(data)] - 0.5)
+        movementsX = rustleValues * (1 + chaos) * (noiseValues[:, len(data):] - 0.5)
+
+        ends = np.repeat(data.endStill[None], len(times), axis=0)
+        ends[:, :, 1] += movementsY * growth
+        ends[:, :, 0] = windX + movementsX * growth
+        return ends
+
+    def windTimes(self, frameCount, step=0.01):
+        """Return the time offsets of frameCount frames starting at the tree's current one,
+        accumulated the way advancing timeOffset by step every frame does."""
+        return np.cumsum(np.concatenate(([self.timeOffset], np.full(max(frameCount - 1, 0), step))))[:frameCount]
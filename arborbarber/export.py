@@ -0,0 +1,180 @@
+"""Writers for tree geometry files, filled in bulk from the mesh arrays.
+
+Mesh writers take an iterable of (verts, faceSizes, faceVerts) pieces in Blender space with
+face corners indexing the whole mesh, such as [treeMesh(tree)] or streamMesh(stream), so
+trees too large for memory can be written piece by piece. Binary buffers are spooled to
+temporary files with tofile and copied into place once the header's counts are known.
+"""
+
+import json
+import os
+import shutil
+import struct
+import tempfile
+import numpy as np
+
+POINT_CACHE_HEADER = struct.Struct("<12siiffi")
+
+def writePointCache(path, frames, startFrame=0, sampleRate=1):
+    """Write vertex animation as a PC2 point cache, which Blender's Mesh Cache modifier plays back.
+    :param path: file to write
+    :type path: str
+    :param frames: vertex positions of every frame, shape (frames, v, 3)
+    :type frames: numpy.ndarray
+    :param startFrame: frame the first sample belongs to
+    :type startFrame: float
+    :param sampleRate: frames between samples
+    :type sampleRate: float
+    """
+    frames = np.asarray(frames)
+    with open(path, "wb") as file:
+        file.write(POINT_CACHE_HEADER.pack(b"POINTCACHE2\0", 1, frames.shape[1], startFrame, sampleRate, frames.shape[0]))
+        np.ascontiguousarray(frames, dtype="<f4").tofile(file)
+
+def readPointCache(path):
+    """Map a PC2 point cache written by writePointCache without reading it into memory.
+    :returns: float32 (frames, v, 3) vertex positions and the start frame
+    :rtype: tuple
+    """
+    with open(path, "rb") as file:
+        magic, version, pointCount, startFrame, sampleRate, frameCount = POINT_CACHE_HEADER.unpack(file.read(POINT_CACHE_HEADER.size))
+    if magic != b"POINTCACHE2\0":
+        raise ValueError("not a PC2 point cache: %s" % path)
+    return np.memmap(path, dtype="<f4", mode="r", offset=POINT_CACHE_HEADER.size, shape=(frameCount, pointCount, 3)), startFrame
+
+# rows formatted per call when writing text, to bound the size of the formatted string
+TEXT_ROWS = 1 << 16
+
+def faceRuns(faceSizes, faceVerts):
+    """Yield (size, corners) for each run of consecutive faces with the same corner count.
+    corners has shape (faces, size); tube and leaf meshes only have a handful of runs.
+    """
+    faceSizes = np.asarray(faceSizes)
+    if not len(faceSizes):
+        return
+    breaks = np.flatnonzero(np.diff(faceSizes)) + 1
+    cornerStarts = np.concatenate(([0], np.cumsum(faceSizes, dtype=np.int64)))
+    for start, end in zip(np.concatenate(([0], breaks)), np.concatenate((breaks, [len(faceSizes)]))):
+        size = int(faceSizes[start])
+        yield size, np.asarray(faceVerts[cornerStarts[start]:cornerStarts[end]]).reshape(-1, size)
+
+def yUp(verts):
+    """Return Blender-space vertices in the Y-up space of OBJ and glTF, (x, y, z) -> (x, z, -y)."""
+    verts = np.asarray(verts)
+    return np.stack((verts[:, 0], verts[:, 2], -verts[:, 1]), axis=-1)
+
+def writeRows(f, template, rows):
+    """Write a line per row, formatting many rows with one % operation."""
+    for start in range(0, len(rows), TEXT_ROWS):
+        block = rows[start:start + TEXT_ROWS]
+        f.write((template * len(block)) % tuple(block.ravel().tolist()))
+
+def copySpool(f, spool):
+    spool.seek(0)
+    shutil.copyfileobj(spool, f, 1 << 24)
+
+def writeObj(path, pieces):
+    """Write mesh pieces to a Wavefront OBJ file, Y-up as OBJ importers expect.
+    :param path: file to write
+    :type path: str
+    :param pieces: (verts, faceSizes, faceVerts) of each piece of the mesh
+    :type pieces: iterable
+    """
+    with open(path, "w") as f:
+        f.write("# Arbor Barber\n")
+        for verts, faceSizes, faceVerts in pieces:
+            writeRows(f, "v %.6f %.6f %.6f\n", yUp(verts))
+            for size, corners in faceRuns(faceSizes, faceVerts):
+                writeRows(f, "f" + " %d" * size + "\n", corners.astype(np.int64) + 1)
+
+def writePly(path, pieces):
+    """Write mesh pieces to a binary little-endian PLY file, Z-up like Blender.
+    :param path: file to write
+    :type path: str
+    :param pieces: (verts, faceSizes, faceVerts) of each piece of the mesh
+    :type pieces: iterable
+    """
+    vertCount = 0
+    faceCount = 0
+    with tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path))) as vertSpool, \
+         tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path))) as faceSpool:
+        for verts, faceSizes, faceVerts in pieces:
+            np.ascontiguousarray(verts, dtype="<f4").tofile(vertSpool)
+            vertCount += len(verts)
+            for size, corners in faceRuns(faceSizes, faceVerts):
+                records = np.empty(len(corners), dtype=[("size", "u1"), ("corners", "<i4", (size,))])
+                records["size"] = size
+                records["corners"] = corners
+                records.tofile(faceSpool)
+                faceCount += len(corners)
+
+        with open(path, "wb") as f:
+            f.write(("ply\nformat binary_little_endian 1.0\ncomment Arbor Barber\n"
+                     "element vertex %d\nproperty float x\nproperty float y\nproperty float z\n"
+                     "element face %d\nproperty list uchar int vertex_indices\nend_header\n" % (vertCount, faceCount)).encode("ascii"))
+            copySpool(f, vertSpool)
+            copySpool(f, faceSpool)
+
+GLB_HEADER = struct.Struct("<4sII")
+GLB_CHUNK = struct.Struct("<I4s")
+
+def writeGlb(path, pieces):
+    """Write mesh pieces to a binary glTF 2.0 file as one triangulated, Y-up mesh.
+    :param path: file to write
+    :type path: str
+    :param pieces: (verts, faceSizes, faceVerts) of each piece of the mesh
+    :type pieces: iterable
+    """
+    vertCount = 0
+    indexCount = 0
+    low = np.full(3, np.inf, dtype=np.float32)
+    high = np.full(3, -np.inf, dtype=np.float32)
+    with tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path))) as vertSpool, \
+         tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path))) as indexSpool:
+        for verts, faceSizes, faceVerts in pieces:
+            verts = yUp(verts).astype("<f4")
+            if len(verts):
+                low = np.minimum(low, verts.min(axis=0))
+                high = np.maximum(high, verts.max(axis=0))
+            verts.tofile(vertSpool)
+            vertCount += len(verts)
+            for size, corners in faceRuns(faceSizes, faceVerts):
+                # fan triangulation keeps each face's winding
+                fans = np.arange(1, size - 1)
+                triangles = np.stack((np.repeat(corners[:, :1], size - 2, axis=1), corners[:, fans], corners[:, fans + 1]), axis=-1)
+                triangles.astype("<u4").tofile(indexSpool)
+                indexCount += triangles.size
+
+        vertBytes = 12 * vertCount
+        indexBytes = 4 * indexCount
+        document = {
+            "asset": {"version": "2.0", "generator": "Arbor Barber"},
+            "scene": 0,
+            "scenes": [{"nodes": [0]}],
+            "nodes": [{"mesh": 0, "name": "Tree"}],
+            "meshes": [{"primitives": [{"attributes": {"POSITION": 0}, "indices": 1}]}],
+            "buffers": [{"byteLength": vertBytes + indexBytes}],
+            "bufferViews": [{"buffer": 0, "byteOffset": 0, "byteLength": vertBytes, "target": 34962},
+                            {"buffer": 0, "byteOffset": vertBytes, "byteLength": indexBytes, "target": 34963}],
+            "accessors": [{"bufferView": 0, "componentType": 5126, "count": vertCount, "type": "VEC3", "min": low.tolist(), "max": high.tolist()},
+                          {"bufferView": 1, "componentType": 5125, "count": indexCount, "type": "SCALAR"}],
+        }
+        document = json.dumps(document).encode()
+        document += b" " * (-len(document) % 4)
+
+        with open(path, "wb") as f:
+            f.write(GLB_HEADER.pack(b"glTF", 2, GLB_HEADER.size + 2 * GLB_CHUNK.size + len(document) + vertBytes + indexBytes))
+            f.write(GLB_CHUNK.pack(len(document), b"JSON"))
+            f.write(document)
+            f.write(GLB_CHUNK.pack(vertBytes + indexBytes, b"BIN\0"))
+            copySpool(f, vertSpool)
+            copySpool(f, indexSpool)
+
+MESH_WRITERS = {".obj": writeObj, ".ply": writePly, ".glb": writeGlb}
+
+def writeMesh(path, pieces):
+    """Write mesh pieces with the writer for path's extension: .obj, .ply or .glb."""
+    writer = MESH_WRITERS.get(os.path.splitext(path)[1].lower())
+    if writer is None:
+        raise ValueError("unsupported mesh format: %s" % path)
+    writer(path, pieces)
@@ -0,0 +1,218 @@
+"""Grow many trees in parallel on a process pool, and blow wind through all of them at once.
+
+Each worker seeds its own random module, so a job grows exactly the tree serial generation
+would for the same seed. Workers write their branch arrays to one flat file in shared memory
+(/dev/shm where available) and the parent memory-maps it, so arrays are never pickled or copied.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from .core import BranchArrays, Tree, generateTree, noiseArray, remap, windChaos, windVariation
+from .profiling import stage
+
+ALIGNMENT = 64
+
+
+def sharedDirectory():
+    """Return a RAM-backed directory if the system has one, otherwise the temp directory."""
+    if os.path.isdir("/dev/shm"):
+        return "/dev/shm"
+    return tempfile.gettempdir()
+
+def writeArrays(path, arrays):
+    """Write named arrays back to back into one raw file.
+    :param path: file to create
+    :type path: str
+    :param arrays: arrays to write, by name
+    :type arrays: dict
+    :returns: (name, dtype, shape, offset) of every array
+    :rtype: list
+    """
+    with open(path, "wb") as f:
+        return appendArrays(f, arrays)
+
+def appendArrays(f, arrays):
+    """Write named arrays back to back at the end of an open binary file, each aligned.
+    :param f: file opened for writing, positioned at its end
+    :type f: file
+    :param arrays: arrays to write, by name
+    :type arrays: dict
+    :returns: (name, dtype, shape, offset) of every array
+    :rtype: list
+    """
+    layout = []
+    offset = f.tell()
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        f.write(b"\0" * (-offset % ALIGNMENT))
+        offset += -offset % ALIGNMENT
+        layout.append((name, array.dtype.str, array.shape, offset))
+        f.write(memoryview(array).cast("B"))
+        offset += array.nbytes
+    return layout
+
+def mapArrays(path, layout, mode="r+"):
+    """Memory-map arrays written by writeArrays.
+    :returns: arrays by name, backed by the file
+    :rtype: dict
+    """
+    arrays = {}
+    for name, dtype, shape, offset in layout:
+        if int(np.prod(shape)) == 0:
+            arrays[name] = np.zeros(shape, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(path, dtype=dtype, mode=mode, offset=offset, shape=tuple(shape))
+    return arrays
+
+def growJob(job, directory):
+    """Grow one (parameters, seed) job and write its branch arrays into directory.
+    :returns: the file, the arrays' layout in it, the growth level and the per-level random states
+    :rtype: tuple
+    """
+    parameters, seed = job
+    tree = generateTree(seed, **parameters)
+    fd, path = tempfile.mkstemp(prefix="arborbarber-", suffix=".bin", dir=directory)
+    os.close(fd)
+    layout = writeArrays(path, {field: getattr(tree.data, field) for field in BranchArrays.FIELDS})
+    return path, layout, tree.growthLevel, tree.levelStates
+
+def adoptTree(parameters, seed, data, levelStates):
+    """Return a Tree wrapping already grown branch arrays, with its leaves in place.
+    The random states grown with let it regrow to another max level as the original could.
+    """
+    tree = Tree(**parameters, seed=seed, data=data)
+    tree.levelStates = levelStates
+    while not tree.hasLeaves:
+        tree.grow()
+    return tree
+
+def generateForest(jobs, processes=None):
+    """Grow a list of (parameters, seed) jobs, in parallel unless processes is 1.
+    :param jobs: Tree keyword arguments and seed for each tree
+    :type jobs: list
+    :param processes: number of worker processes, default one per core
+    :type processes: int
+    :returns: the grown trees in job order, identical to growing each one serially
+    :rtype: list
+    """
+    jobs = list(jobs)
+    if processes == 1 or len(jobs) <= 1:
+        return [generateTree(seed, **parameters) for parameters, seed in jobs]
+
+    # every worker writes into one private directory, so whatever a failed run leaves is removed with it
+    directory = tempfile.mkdtemp(prefix="arborbarber-", dir=sharedDirectory())
+    chunksize = max(1, len(jobs) // (4 * (processes or os.cpu_count() or 1)))
+    trees = []
+    try:
+        with ProcessPoolExecutor(processes) as pool:
+            results = list(pool.map(growJob, jobs, repeat(directory), chunksize=chunksize))
+
+        for (parameters, seed), (path, layout, growthLevel, levelStates) in zip(jobs, results):
+            fields = mapArrays(path, layout)
+            if os.name == "nt":
+                # Windows cannot delete a mapped file, so take a copy and drop the mapping
+                fields = {name: np.array(array) for name, array in fields.items()}
+            # on POSIX the mapping outlives the file name
+            os.unlink(path)
+            trees.append(adoptTree(parameters, seed, BranchArrays.fromFields(fields, growthLevel), levelStates))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return trees
+
+class ForestWind:
+    """Wind for many trees at once, on one shared clock.
+    The branch arrays of all trees are concatenated once, and each tree's begins, ends and wind
+    poses become views of the concatenated arrays, so a single vectorized pass per frame moves
+    every tree with nothing copied back. Each tree gets the ends applyWind would give it at a
+    timeOffset of the shared time plus its phase. Trees must not be regrown while bound.
+    :param trees: grown trees
+    :type trees: list
+    :param phases: time added to the shared clock for each tree, by default each tree's timeOffset
+    :type phases: array_like
+    :param chunkSize: branches evaluated at once, to bound temporary memory
+    :type chunkSize: int
+    """
+
+    def __init__(self, trees, phases=None, chunkSize=1 << 14):
+        self.trees = list(trees)
+        self.chunkSize = chunkSize
+        self.time = 0
+        counts = np.array([len(tree.data) for tree in self.trees], dtype=np.int64)
+        self.stops = np.cumsum(counts)
+        starts = self.stops - counts
+        self.phases = np.array([tree.timeOffset for tree in self.trees] if phases is None else phases, dtype=np.float64)
+        # tree of every branch, to spread per-tree values over the branches
+        self.branchTrees = np.repeat(np.arange(len(self.trees)), counts)
+
+        datas = [tree.data for tree in self.trees]
+        self.endStill = np.concatenate([data.endStill for data in datas]).reshape(-1, 3)
+        self.level = np.concatenate([data.level for data in datas])
+        self.randomOffset = np.concatenate([data.randomOffset for data in datas])
+        self.parent = np.concatenate([np.where(data.parent >= 0, data.parent + start, -1) for data, start in zip(datas, starts)])
+        self.leafIndices = np.concatenate([tree.leafIndices + start for tree, start in zip(self.trees, starts)]).astype(np.int64)
+        self.begin = np.concatenate([data.begin for data in datas]).reshape(-1, 3)
+        self.end = np.concatenate([data.end for data in datas]).reshape(-1, 3)
+        self.endWind = np.concatenate([data.endWind for data in datas]).reshape(-1, 3)
+        for data, start, stop in zip(datas, starts, self.stops):
+            data.begin = self.begin[start:stop]
+            data.end = self.end[start:stop]
+            data.endWind = self.endWind[start:stop]
+
+    def __len__(self):
+        return len(self.trees)
+
+    @property
+    def leaves(self):
+        """Current positions of the leaves of every tree, tree after tree."""
+        return self.end[self.leafIndices]
+
+    def advance(self, step=0.01):
+        """Move the shared clock on by step, as advancing a tree's timeOffset by step every frame does."""
+        self.time += step
+
+    def apply(self, strength, variation=windVariation, chaos=windChaos):
+        """Blow every tree at the current time, as applyWind does for one tree.
+        :param strength: wind strength, or one per tree
+        :type strength: float or array_like
+        :param variation: how much the wind varies between levels
+        :type variation: float
+        :param chaos: how fast the wind and the rustling change
+        :type chaos: float
+        """
+        with stage("forestWind") as record:
+            strength = np.asarray(strength, dtype=np.float64)
+            times = self.time + self.phases
+            # large temporaries fall out of the cache, so branches are processed a chunk at a time
+            for start in range(0, len(self.level), self.chunkSize):
+                chunk = slice(start, start + self.chunkSize)
+                trees = self.branchTrees[chunk]
+                level = self.level[chunk]
+                noiseValues = noiseArray(times[trees]*chaos + level / 100)
+                movements = remap(variation, 0, 1, 0.5, noiseValues) * (strength[trees] if strength.ndim else strength)
+                self.end[chunk, 0] = self.endStill[chunk, 0] + movements * (level + 1)
+                self.endWind[chunk] = self.end[chunk]
+
+            # each tree rustles by how far its last branch was blown
+            lasts = self.stops - 1
+            distFromStill = np.abs(self.end[lasts, 0] - self.endStill[lasts, 0])
+            rustleValues = np.minimum(remap(distFromStill, 0, 150, 0.05, 0.2), 2)
+            rustleStrengths = rustleValues * (1 + chaos)
+            rustleTimes = times * (rustleValues * 2)
+            for start in range(0, len(self.level), self.chunkSize):
+                chunk = slice(start, start + self.chunkSize)
+                trees = self.branchTrees[chunk]
+                growth = self.level[chunk] + 1
+                t = rustleTimes[trees] + self.randomOffset[chunk]
+                noiseValues = noiseArray(np.concatenate((t, t + 100)))
+                movementsY = rustleStrengths[trees] * (noiseValues[:len(t)] - 0.5)
+                movementsX = rustleStrengths[trees] * (noiseValues[len(t):] - 0.5)
+                self.end[chunk, 1] = self.endStill[chunk, 1] + movementsY * growth
+                self.end[chunk, 0] = self.endWind[chunk, 0] + movementsX * growth
+            children = self.parent >= 0
+            self.begin[children] = self.end[self.parent[children]]
+            record.count(trees=len(self.trees), branches=len(self.level), noiseSamples=3 * len(self.level))
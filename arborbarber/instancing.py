@@ -0,0 +1,122 @@
+"""Self-similar trees built from one subtree template per level.
+
+Every branch of a level shares one template: its own tube, plus the placements of the next
+level's template at its end. Storage and meshing are linear in the number of levels instead
+of exponential, and Blender draws the rest as nested collection instances.
+"""
+
+from math import pi
+import numpy as np
+
+from .core import remap, rotateAroundMany
+from .mesh import LEAF_SCALE, leafMesh, ringFaces, ringVerts, toBlenderSpace
+
+# tree-space to Blender-space rotation, as toBlenderSpace applies it
+BLENDER_SPACE = np.array([[1, 0, 0], [0, 0, 1], [0, -1, 0]], dtype=np.float64)
+
+
+def rotationMatrices(axes, angles):
+    """Return (n, 3, 3) matrices rotating around each axis by each angle."""
+    axes = np.asarray(axes, dtype=np.float64).reshape(-1, 3)
+    count = max(len(axes), np.size(angles))
+    axes = np.repeat(np.broadcast_to(axes, (count, 3)), 3, axis=0)
+    basis = np.tile(np.eye(3), (count, 1))
+    # rows of the result are the rotated basis vectors, so the matrices are their transposes
+    return rotateAroundMany(basis, axes, np.repeat(np.broadcast_to(angles, (count,)), 3)).reshape(count, 3, 3).transpose(0, 2, 1)
+
+class InstancedTree:
+    """A tree with one template per level, each subtree of a level a rotated copy of the others.
+    Split parameters are drawn once per level; each placement also spins its subtree about the
+    branch axis by a random angle, so instances do not all face the same way.
+    :param seed: seed of the per-level draws
+    :type seed: int
+    :param sides: number of vertices around each branch ring
+    :type sides: int
+    :param leaves: whether the last level's template carries a leaf
+    :type leaves: bool
+    :param leafSizeVariation: maximum fraction the leaf may shrink by
+    :type leafSizeVariation: float
+    :param parameters: keyword arguments as for Tree; growthMode and collision pruning are ignored
+    """
+
+    def __init__(self, seed, sides=6, leaves=True, leafSizeVariation=0, **parameters):
+        self.parameters = parameters
+        rng = np.random.default_rng(seed)
+        maxLevel = parameters["maxLevel"]
+        trunkWidth = parameters["trunkWidth"]
+        axis = np.array([0.0, -1.0, 0.0])
+
+        # per-level templates in tree space, each branch running from the origin along -y
+        self.meshes = []
+        self.placements = []
+        self.counts = []
+        length = parameters["trunkLen"]
+        for level in range(maxLevel + 1):
+            radius = 0.01 * max(remap(level, 0, 5, trunkWidth, 1), 1)
+            startRadius = 0.01 * max(remap(level - 1, 0, 5, trunkWidth, 1), 1)
+            end = axis * length
+            verts = ringVerts(np.zeros((1, 3)), end[None], np.array([startRadius]), np.array([radius]), sides)
+            faceSizes, faceVerts = ringFaces(1, sides)
+            if level == maxLevel and leaves:
+                rotation = rng.random(3) * np.array([pi, pi, 2*pi])
+                scale = np.multiply(LEAF_SCALE, 1 - leafSizeVariation * rng.random())
+                leafVerts, leafSizes, leafCorners = leafMesh(toBlenderSpace(end[None]), rotation[None], scale[None])
+                verts = np.concatenate((toBlenderSpace(verts), leafVerts))
+                faceSizes = np.concatenate((faceSizes, leafSizes))
+                faceVerts = np.concatenate((faceVerts, leafCorners + 2 * sides))
+            else:
+                verts = toBlenderSpace(verts)
+            self.meshes.append((verts, faceSizes, faceVerts))
+            if level == maxLevel:
+                self.placements.append(np.zeros((0, 4, 4)))
+                break
+
+            count = int(rng.integers(parameters["minNumBranch"], parameters["maxNumBranch"], endpoint=True))
+            split = parameters["maxSplitAngle"] + (parameters["minSplitAngle"] - parameters["maxSplitAngle"]) * rng.random()
+            size = parameters["maxBranchingSize"] + (parameters["minBranchingSize"] - parameters["maxBranchingSize"]) * rng.random()
+            angles = rng.random() * 2*pi/count + np.arange(count) * 2*pi/count
+            spins = rng.random(count) * 2*pi
+
+            # tilt away from the parent axis, spin around it, then spin each subtree about its own axis
+            tilt = rotationMatrices(np.cross([1, 0, 0], axis), split)[0]
+            rotations = rotationMatrices(axis, angles) @ tilt @ rotationMatrices(axis, spins)
+            placements = np.zeros((count, 4, 4))
+            placements[:, :3, :3] = BLENDER_SPACE @ rotations @ BLENDER_SPACE.T
+            placements[:, :3, 3] = BLENDER_SPACE @ end
+            placements[:, 3, 3] = 1
+            self.placements.append(placements)
+            self.counts.append(count)
+            length *= size
+
+    def branchCount(self):
+        """Return how many branches the expanded tree has."""
+        return int(np.sum(np.cumprod([1] + self.counts)))
+
+    def worldMatrices(self, level, first=0):
+        """Return the (n, 4, 4) Blender-space placement of every instance of a level's template,
+        relative to one instance of level first's template."""
+        matrices = np.eye(4)[None]
+        for placements in self.placements[first:level]:
+            matrices = np.einsum("aij,bjk->abik", matrices, placements).reshape(-1, 4, 4)
+        return matrices
+
+    def mesh(self, first=0):
+        """Return the fully expanded mesh, e.g. to export it; its size is exponential in depth.
+        :param first: level whose template the mesh starts from, 0 for the whole tree
+        :type first: int
+        :returns: float vertices, int32 face sizes and int32 face corners in Blender space,
+            relative to the template of level first
+        :rtype: tuple
+        """
+        vertParts = []
+        sizeParts = []
+        cornerParts = []
+        start = 0
+        for level in range(first, len(self.meshes)):
+            verts, faceSizes, faceVerts = self.meshes[level]
+            matrices = self.worldMatrices(level, first)
+            vertParts.append((np.einsum("nij,vj->nvi", matrices[:, :3, :3], verts) + matrices[:, None, :3, 3]).reshape(-1, 3))
+            sizeParts.append(np.tile(faceSizes, len(matrices)))
+            cornerParts.append((faceVerts + start + len(verts) * np.arange(len(matrices))[:, None]).ravel())
+            start += len(matrices) * len(verts)
+        return np.concatenate(vertParts), np.concatenate(sizeParts), np.concatenate(cornerParts).astype(np.int32)
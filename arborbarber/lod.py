@@ -0,0 +1,108 @@
+"""Level-of-detail meshes built from one grown tree."""
+
+from math import pi
+import numpy as np
+
+from .core import BranchArrays, Tree
+from .mesh import treeMesh
+
+
+def lodLevel(tree, pixelHeight, minPixels=2, minWidthPixels=1):
+    """Return the deepest branch level still worth drawing when the tree is pixelHeight tall on screen.
+    A level is kept while its branches are on average at least minPixels long and minWidthPixels
+    wide on screen; as levels are stored in order, the kept branches are a prefix of the tree's arrays.
+    """
+    data = tree.data
+    pixelsPerUnit = pixelHeight / max(np.ptp(data.endStill, axis=0).max(), 1e-9)
+    lengths = np.linalg.norm(data.end - data.begin, axis=1) * pixelsPerUnit
+    # rings have radius 0.01 * thickness
+    widths = 0.02 * data.thickness * pixelsPerUnit
+    branchCounts = np.maximum(np.bincount(data.level), 1)
+    meanLengths = np.bincount(data.level, lengths) / branchCounts
+    meanWidths = np.bincount(data.level, widths) / branchCounts
+    dropped = np.flatnonzero((meanLengths < minPixels) | (meanWidths < minWidthPixels))
+    return max(int(dropped[0]) - 1, 0) if len(dropped) else int(data.level.max())
+
+def lodSides(tree, pixelHeight, sides=6, sidePixels=4):
+    """Return how many sides the branch rings need so the trunk's outline has sides about sidePixels long."""
+    data = tree.data
+    pixelsPerUnit = pixelHeight / max(np.ptp(data.endStill, axis=0).max(), 1e-9)
+    trunkPixels = 0.02 * data.thickness[0] * pixelsPerUnit
+    return int(np.clip(round(pi * trunkPixels / sidePixels), 3, sides))
+
+def leafAncestors(tree, level):
+    """Return the ancestor at level of each of the tree's leaves, or the leaf itself where it is no deeper."""
+    data = tree.data
+    ancestors = tree.leafIndices
+    while len(ancestors) and data.level[ancestors].max() > level:
+        deep = data.level[ancestors] > level
+        ancestors = np.where(deep, data.parent[ancestors], ancestors)
+    return ancestors
+
+def prunedTree(tree, level):
+    """Return a tree sharing the branches of tree up to level, with a leaf on each branch that
+    has leaves of tree below it, in the order mergedLeaves gives them."""
+    data = tree.data
+    count = int(np.count_nonzero(data.level <= level))
+    fields = {field: getattr(data, field)[:count] for field in BranchArrays.FIELDS}
+    fields["hasBranches"] = fields["hasBranches"] & (fields["level"] < level)
+    # the leaves stand in for the tree's own, already thinned ones, so they are not thinned again
+    parameters = dict(tree.parameters(), maxLevel=level, leafSpacing=0, leafCount=0, leafDensity=0)
+    pruned = Tree(**parameters, data=BranchArrays.fromFields(fields, level))
+    pruned.leafIndices = np.unique(leafAncestors(tree, level))
+    pruned.hasLeaves = True
+    return pruned
+
+def mergedLeaves(tree, pruned, leaves):
+    """Return one leaf per leaf of pruned standing in for all the leaves of tree below it.
+    Each keeps the rotation of its first merged leaf and grows with the square root of the
+    number merged, so the canopy covers about the same area.
+    """
+    rotations, scales = leaves
+    first, counts = np.unique(leafAncestors(tree, pruned.growthLevel), return_index=True, return_counts=True)[1:]
+    return rotations[first], scales[first] * np.sqrt(counts)[:, None]
+
+def lodChain(tree, pixelHeights, sides=6, leaves=None, minPixels=2, sidePixels=4, minWidthPixels=1):
+    """Return a mesh for each level of detail, dropping the levels, ring sides and leaves that
+    would be too small to see at each screen size.
+    :param tree: grown tree
+    :type tree: Tree
+    :param pixelHeights: on-screen height of the tree in pixels each LOD is made for, largest first
+    :type pixelHeights: list
+    :param sides: number of vertices around each branch ring at full detail
+    :type sides: int
+    :param leaves: per-leaf rotations and scales from leafTransforms, or None for no leaves
+    :type leaves: tuple
+    :param minPixels: average on-screen length below which a branch level is dropped
+    :type minPixels: float
+    :param sidePixels: on-screen length of a trunk ring side to aim for
+    :type sidePixels: float
+    :param minWidthPixels: average on-screen width below which a branch level is dropped
+    :type minWidthPixels: float
+    :returns: float vertices, int32 face sizes and int32 face corners of each LOD, in Blender space;
+        LODs that could not be made any coarser than the one before are left out
+    :rtype: list
+    """
+    meshes = []
+    deepest = int(tree.data.level.max())
+    previous = None
+    for pixelHeight in pixelHeights:
+        level = min(lodLevel(tree, pixelHeight, minPixels, minWidthPixels), deepest)
+        lodSideCount = lodSides(tree, pixelHeight, sides, sidePixels)
+        if previous is not None:
+            previousLevel, previousSides = previous
+            level = min(level, previousLevel)
+            lodSideCount = min(lodSideCount, previousSides)
+            # every smaller screen size gets less detail, even while the branches are still big enough to see
+            if (level, lodSideCount) == previous:
+                if level == 0:
+                    break
+                level -= 1
+        previous = level, lodSideCount
+
+        lodTree = tree if level == deepest else prunedTree(tree, level)
+        lodLeaves = leaves
+        if leaves is not None and lodTree is not tree:
+            lodLeaves = mergedLeaves(tree, lodTree, leaves)
+        meshes.append(treeMesh(lodTree, lodSideCount, lodLeaves))
+    return meshes
@@ -0,0 +1,255 @@
+"""Mesh arrays built from grown trees: skeletons, branch tubes and leaves."""
+
+from math import pi
+import numpy as np
+
+from .core import remap, windChaos, windVariation
+from .profiling import stage
+
+def treeSkeleton(tree):
+    """Return the vertices and edges of a tree's branch skeleton.
+    Vertex 0 is the base of the trunk and vertex i + 1 is the end of branch i, so the
+    topology comes straight from the parent indices without searching for points.
+    :param tree: grown tree
+    :type tree: Tree
+    :returns: float (n + 1, 3) vertices and int32 (n, 2) edges
+    :rtype: tuple
+    """
+    data = tree.data
+    verts = np.concatenate((data.begin[:1], data.end))
+    branchEnds = np.arange(1, len(data) + 1, dtype=np.int32)
+    edges = np.column_stack((branchEnds, data.parent + 1)).astype(np.int32)
+    roots = data.parent < 0
+    edges[roots] = np.column_stack((np.zeros(roots.sum()), branchEnds[roots]))
+    return verts, edges
+
+def tubeMesh(tree, sides=6):
+    """Return a closed tube mesh sweeping a ring of vertices along every branch.
+    Each branch gets a ring at its begin and end, tapering from its parent's radius to its
+    own, with radii 0.01 * max(remap(level, 0, 5, trunkWidth, 1), 1) as the skin radii were.
+    Both rings of every branch are capped, so each tube is closed where it meets its parent
+    and children rather than leaving a gap at the joint.
+    :param tree: grown tree
+    :type tree: Tree
+    :param sides: number of vertices around each ring
+    :type sides: int
+    :returns: float (2 * sides * n, 3) vertices, int32 face sizes and int32 face corners
+    :rtype: tuple
+    """
+    return (tubeVerts(tree, sides),) + tubeFaces(tree, sides)
+
+def tubeVerts(tree, sides=6, ends=None):
+    """Return the vertices of tubeMesh, which are all that changes when the tree moves.
+    ends may replace the tree's own branch ends with (..., n, 3) arrays, e.g. one per frame,
+    giving (..., 2 * sides * n, 3) vertices.
+    """
+    data = tree.data
+    if ends is None:
+        begins, ends = data.begin, data.end
+    else:
+        begins = np.where((data.parent >= 0)[:, None], ends[..., np.maximum(data.parent, 0), :], data.begin)
+
+    radii = 0.01 * data.thickness
+    baseRadius = 0.01 * max(remap(-1, 0, 5, tree.trunkWidth, 1), 1)
+    hasParent = data.parent >= 0
+    startRadii = np.where(hasParent, radii[np.where(hasParent, data.parent, 0)], baseRadius)
+    return ringVerts(begins, ends, startRadii, radii, sides)
+
+def ringVerts(begins, ends, startRadii, radii, sides=6):
+    """Return a ring of vertices around the begin and end of every branch.
+    :param begins: branch start points, shape (..., n, 3)
+    :type begins: numpy.ndarray
+    :param ends: branch end points, shape (..., n, 3)
+    :type ends: numpy.ndarray
+    :param startRadii: ring radius at each begin, shape (n,)
+    :type startRadii: numpy.ndarray
+    :param radii: ring radius at each end, shape (n,)
+    :type radii: numpy.ndarray
+    :returns: float (..., 2 * sides * n, 3) vertices, start ring then end ring per branch
+    :rtype: numpy.ndarray
+    """
+    # orthonormal frame around each branch direction
+    dirs = ends - begins
+    lengths = np.linalg.norm(dirs, axis=-1)[..., None]
+    dirs = np.divide(dirs, lengths, out=np.broadcast_to([0.0, -1.0, 0.0], dirs.shape).copy(), where=lengths > 0)
+    helpers = np.eye(3)[np.argmin(np.abs(dirs), axis=-1)]
+    us = np.cross(dirs, helpers)
+    us /= np.linalg.norm(us, axis=-1)[..., None]
+    vs = np.cross(dirs, us)
+
+    angles = np.arange(sides) * 2*pi / sides
+    ringOffsets = np.cos(angles)[:, None] * us[..., None, :] + np.sin(angles)[:, None] * vs[..., None, :]
+    startRings = begins[..., None, :] + startRadii[:, None, None] * ringOffsets
+    endRings = ends[..., None, :] + radii[:, None, None] * ringOffsets
+    return np.stack((startRings, endRings), axis=-3).reshape(ends.shape[:-2] + (-1, 3))
+
+def tubeFaces(tree, sides=6):
+    """Return the faces of tubeMesh, which depend only on the tree's topology."""
+    data = tree.data
+    return ringFaces(len(data), sides)
+
+def ringFaces(count, sides=6, first=0):
+    """Return the faces joining the rings of ringVerts, with both rings of every branch capped.
+    :param count: number of branches
+    :type count: int
+    :param first: index of the first ring vertex, for meshes assembled in pieces
+    :type first: int
+    :returns: int32 face sizes and face corners
+    :rtype: tuple
+    """
+    side = np.arange(sides, dtype=np.int64)
+    nextSide = (side + 1) % sides
+    starts = first + (np.arange(count, dtype=np.int64) * 2 * sides)[:, None]
+    quads = np.stack((starts + side, starts + nextSide, starts + sides + nextSide, starts + sides + side), axis=-1).reshape(-1)
+
+    tips = starts + sides + side
+    bases = starts + side[::-1]
+
+    faceSizes = np.concatenate((np.full(count * sides, 4), np.full(2 * count, sides))).astype(np.int32)
+    faceVerts = np.concatenate((quads, tips.ravel(), bases.ravel())).astype(np.int32)
+    return faceSizes, faceVerts
+
+def toBlenderSpace(points):
+    """Return tree-space points in Blender's Z-up space, (x, y, z) -> (x, z, -y)."""
+    points = np.asarray(points)
+    return np.stack((points[..., 0], points[..., 2], -points[..., 1]), axis=-1)
+
+def uvSphere(segments, ringCount, radius):
+    """Return the vertices and faces of a UV sphere laid out like Blender's primitive.
+    Faces are given as per-face corner counts plus the flat list of corner vertex indices.
+    :returns: float (v, 3) vertices, int32 face sizes and int32 face corners
+    :rtype: tuple
+    """
+    polar = np.arange(1, ringCount) * pi / ringCount
+    azimuth = np.arange(segments) * 2*pi / segments
+    rings = np.stack((np.outer(np.sin(polar), np.cos(azimuth)),
+                      np.outer(np.sin(polar), np.sin(azimuth)),
+                      np.repeat(np.cos(polar)[:, None], segments, axis=1)), axis=-1).reshape(-1, 3)
+    verts = np.concatenate(([[0, 0, 1]], rings, [[0, 0, -1]])) * radius
+
+    ring = np.arange(segments)
+    nextRing = (ring + 1) % segments
+    bottom = len(verts) - 1
+    top = np.column_stack((np.zeros(segments), 1 + ring, 1 + nextRing))
+    firstRows = 1 + segments * np.arange(ringCount - 2)[:, None]
+    quads = np.stack((firstRows + ring, firstRows + segments + ring, firstRows + segments + nextRing, firstRows + nextRing), axis=-1).reshape(-1, 4)
+    lastRow = 1 + segments * (ringCount - 2)
+    bottomFan = np.column_stack((lastRow + nextRing, lastRow + ring, np.full(segments, bottom)))
+
+    faceSizes = np.concatenate((np.full(segments, 3), np.full(len(quads), 4), np.full(segments, 3))).astype(np.int32)
+    faceVerts = np.concatenate((top.ravel(), quads.ravel(), bottomFan.ravel())).astype(np.int32)
+    return verts, faceSizes, faceVerts
+
+def eulerToMatrices(rotations):
+    """Return (n, 3, 3) rotation matrices for (n, 3) XYZ Euler angles, as Blender composes them."""
+    cosX, cosY, cosZ = np.cos(rotations).T
+    sinX, sinY, sinZ = np.sin(rotations).T
+    return np.stack((
+        np.stack((cosY*cosZ, sinX*sinY*cosZ - cosX*sinZ, cosX*sinY*cosZ + sinX*sinZ), axis=-1),
+        np.stack((cosY*sinZ, sinX*sinY*sinZ + cosX*cosZ, cosX*sinY*sinZ - sinX*cosZ), axis=-1),
+        np.stack((-sinY, sinX*cosY, cosX*cosY), axis=-1)), axis=1)
+
+# leaf shape, matching the spheres the add-on used to place one at a time
+LEAF_SEGMENTS = 3
+LEAF_RING_COUNT = 6
+LEAF_RADIUS = 0.07
+LEAF_SCALE = (1, 1, 1.3)
+
+def leafTransforms(count, rng, scaleVariation=0):
+    """Return random per-leaf Euler rotations and scales.
+    :param count: number of leaves
+    :type count: int
+    :param rng: generator the values are drawn from
+    :type rng: numpy.random.Generator
+    :param scaleVariation: maximum fraction a leaf may shrink by
+    :type scaleVariation: float
+    :returns: float (count, 3) rotations and float (count, 3) scales
+    :rtype: tuple
+    """
+    rotations = rng.random((count, 3)) * np.array([pi, pi, 2*pi])
+    scales = np.outer(1 - scaleVariation * rng.random(count), LEAF_SCALE)
+    return rotations, scales
+
+def leafMesh(positions, rotations, scales):
+    """Return one mesh holding a transformed leaf at every position.
+    :param positions: leaf locations, shape (n, 3)
+    :type positions: numpy.ndarray
+    :param rotations: XYZ Euler rotation of each leaf, shape (n, 3)
+    :type rotations: numpy.ndarray
+    :param scales: scale of each leaf, shape (n, 3)
+    :type scales: numpy.ndarray
+    :returns: float (n * v, 3) vertices, int32 face sizes and int32 face corners
+    :rtype: tuple
+    """
+    return (leafVerts(positions, rotations, scales),) + leafFaces(len(positions))
+
+def leafFaces(count):
+    """Return the faces of leafMesh for count leaves."""
+    verts, faceSizes, faceVerts = uvSphere(LEAF_SEGMENTS, LEAF_RING_COUNT, LEAF_RADIUS)
+    offsets = np.arange(count, dtype=np.int32)[:, None] * len(verts)
+    return np.tile(faceSizes, count), (faceVerts + offsets).ravel()
+
+def leafVerts(positions, rotations, scales):
+    """Return the vertices of leafMesh only; positions may have leading frame axes."""
+    positions = np.asarray(positions)
+    verts = uvSphere(LEAF_SEGMENTS, LEAF_RING_COUNT, LEAF_RADIUS)[0]
+    matrices = eulerToMatrices(rotations) * scales[:, None, :]
+    return (np.einsum("nij,vj->nvi", matrices, verts) + positions[..., None, :]).reshape(positions.shape[:-2] + (-1, 3))
+
+def treeMesh(tree, sides=6, leaves=None):
+    """Return the tube mesh of a tree, plus its leaves if given, in Blender space.
+    :param tree: grown tree
+    :type tree: Tree
+    :param sides: number of vertices around each branch ring
+    :type sides: int
+    :param leaves: per-leaf rotations and scales from leafTransforms, or None for no leaves
+    :type leaves: tuple
+    :returns: float vertices, int32 face sizes and int32 face corners
+    :rtype: tuple
+    """
+    with stage("treeMesh") as record:
+        faceSizes, faceVerts = tubeFaces(tree, sides)
+        if leaves is not None:
+            leafSizes, leafCorners = leafFaces(len(tree.leafIndices))
+            faceVerts = np.concatenate((faceVerts, leafCorners + 2 * sides * len(tree.data)))
+            faceSizes = np.concatenate((faceSizes, leafSizes))
+        verts = treeMeshVerts(tree, sides, leaves)
+        record.count(branches=len(tree.data), leaves=0 if leaves is None else len(tree.leafIndices), vertices=len(verts), faces=len(faceSizes))
+    return verts, faceSizes, faceVerts
+
+def treeMeshVerts(tree, sides=6, leaves=None):
+    """Return the vertices of treeMesh only, e.g. to move an existing mesh after wind changes."""
+    verts = toBlenderSpace(tubeVerts(tree, sides))
+    if leaves is not None:
+        verts = np.concatenate((verts, leafVerts(toBlenderSpace(tree.leaves), *leaves)))
+    return verts
+
+def bakeWind(tree, frameCount, strength, variation=windVariation, chaos=windChaos, sides=6, leaves=None, step=0.01, chunkFrames=32):
+    """Return the vertices of treeMesh for every frame of a wind animation.
+    Frames start at the tree's timeOffset and advance it by step, as the animated prototype
+    did; chunkFrames frames are evaluated at once over all branches to bound temporary memory.
+    :param tree: grown tree
+    :type tree: Tree
+    :param frameCount: number of frames
+    :type frameCount: int
+    :param strength: wind strength
+    :type strength: float
+    :param sides: number of vertices around each branch ring
+    :type sides: int
+    :param leaves: per-leaf rotations and scales from leafTransforms, or None for no leaves
+    :type leaves: tuple
+    :returns: float32 (frameCount, v, 3) vertices in Blender space
+    :rtype: numpy.ndarray
+    """
+    with stage("bakeWind") as record:
+        tubeCount = 2 * sides * len(tree.data)
+        leafCount = 0 if leaves is None else len(tree.leafIndices) * len(uvSphere(LEAF_SEGMENTS, LEAF_RING_COUNT, LEAF_RADIUS)[0])
+        frames = np.empty((frameCount, tubeCount + leafCount, 3), dtype=np.float32)
+        times = tree.windTimes(frameCount, step)
+        for start in range(0, frameCount, chunkFrames):
+            ends = tree.windEnds(times[start:start + chunkFrames], strength, variation, chaos)
+            frames[start:start + chunkFrames, :tubeCount] = toBlenderSpace(tubeVerts(tree, sides, ends))
+            if leaves is not None:
+                frames[start:start + chunkFrames, tubeCount:] = leafVerts(toBlenderSpace(ends[:, tree.leafIndices]), *leaves)
+        record.count(frames=frameCount, branches=len(tree.data), vertices=frames.shape[1])
+    return frames
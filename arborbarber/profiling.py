@@ -0,0 +1,159 @@
+"""Opt-in timing and counters for the generation pipeline.
+
+Pipeline stages are wrapped in ``with stage("name") as record:``. While no profiler is active,
+stage returns one shared object whose methods do nothing, so the cost is a global lookup and
+a call. While one is active, every stage records its wall time, counts such as branches or
+vertices, and optionally its traced allocations:
+
+    with profile() as profiler:
+        tree = generateTree(seed, **parameters)
+    print(profiler.summary())
+"""
+
+from contextlib import contextmanager
+import threading
+import time
+import tracemalloc
+
+activeProfiler = None
+
+
+class NullStage:
+    """Stands in for a stage record while profiling is off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        return False
+
+    def count(self, **counts):
+        pass
+
+NULL_STAGE = NullStage()
+
+
+class StageRecord:
+    """Wall time, counts and allocations of one run of a stage."""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.counts = {}
+        self.seconds = 0
+        self.allocatedBytes = None
+        self.peakBytes = None
+
+    def __enter__(self):
+        profiler = self.profiler
+        self.outermost = profiler.depth == 0
+        profiler.depth += 1
+        if profiler.traceAllocations:
+            if self.outermost:
+                tracemalloc.reset_peak()
+            self.startBytes = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        self.seconds = time.perf_counter() - self.start
+        profiler = self.profiler
+        if profiler.traceAllocations:
+            current, peak = tracemalloc.get_traced_memory()
+            self.allocatedBytes = current - self.startBytes
+            # nested stages would reset their parent's peak, so only outermost ones track it
+            if self.outermost:
+                self.peakBytes = peak - self.startBytes
+        profiler.depth -= 1
+        profiler.records.append(self)
+        return False
+
+    def count(self, **counts):
+        """Record counts for this run, e.g. count(branches=n, vertices=m)."""
+        self.counts.update(counts)
+
+    def asDict(self):
+        return dict(stage=self.name, seconds=self.seconds, allocatedBytes=self.allocatedBytes, peakBytes=self.peakBytes, **self.counts)
+
+
+class Profiler:
+    """Collects a StageRecord for every stage run while it is active.
+    :param traceAllocations: also trace allocations with tracemalloc, which slows everything down
+    :type traceAllocations: bool
+    """
+
+    def __init__(self, traceAllocations=False):
+        self.traceAllocations = traceAllocations
+        self.records = []
+        # stages nest per thread, so a background generation doesn't upset the main thread's
+        self.local = threading.local()
+        self.startedTracing = False
+
+    @property
+    def depth(self):
+        """Number of stages currently open on the calling thread."""
+        return getattr(self.local, "depth", 0)
+
+    @depth.setter
+    def depth(self, depth):
+        self.local.depth = depth
+
+    def report(self):
+        """Return every recorded stage run in the order they finished, as dictionaries."""
+        return [record.asDict() for record in self.records]
+
+    def summary(self):
+        """Return one row per stage name, in order of first appearance, with the number of
+        calls, total and longest seconds, summed counts and allocations.
+        :rtype: list
+        """
+        rows = {}
+        for record in self.records:
+            row = rows.setdefault(record.name, dict(stage=record.name, calls=0, seconds=0, maxSeconds=0))
+            row["calls"] += 1
+            row["seconds"] += record.seconds
+            row["maxSeconds"] = max(row["maxSeconds"], record.seconds)
+            for name, value in record.counts.items():
+                row[name] = row.get(name, 0) + value
+            if record.allocatedBytes is not None:
+                row["allocatedBytes"] = row.get("allocatedBytes", 0) + record.allocatedBytes
+            if record.peakBytes is not None:
+                row["peakBytes"] = max(row.get("peakBytes", 0), record.peakBytes)
+        return list(rows.values())
+
+    def clear(self):
+        self.records = []
+
+
+def stage(name):
+    """Return a context manager recording the stage called name if a profiler is active."""
+    if activeProfiler is None:
+        return NULL_STAGE
+    return StageRecord(activeProfiler, name)
+
+def enable(traceAllocations=False):
+    """Start recording stages into a new profiler and return it."""
+    global activeProfiler
+    activeProfiler = Profiler(traceAllocations)
+    activeProfiler.startedTracing = traceAllocations and not tracemalloc.is_tracing()
+    if activeProfiler.startedTracing:
+        tracemalloc.start()
+    return activeProfiler
+
+def disable():
+    """Stop recording and return the profiler that was active, if any."""
+    global activeProfiler
+    profiler = activeProfiler
+    activeProfiler = None
+    if profiler is not None and profiler.startedTracing:
+        tracemalloc.stop()
+    return profiler
+
+@contextmanager
+def profile(traceAllocations=False):
+    """Record every stage run inside the with block."""
+    profiler = enable(traceAllocations)
+    try:
+        yield profiler
+    finally:
+        disable()
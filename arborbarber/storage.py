@@ -0,0 +1,82 @@
+"""Saving grown trees to disk and memory-mapping them back.
+
+A tree file is a fixed header, the branch arrays written raw and aligned, then a JSON index
+holding the format version, parameters, seed, growth level, per-level random states and the
+arrays' layout, followed by the index length. Loading reads only the header and index and maps the arrays.
+"""
+
+import json
+import struct
+
+from .core import BranchArrays, Tree
+from .forest import appendArrays, mapArrays
+
+TREE_MAGIC = b"ARBTREE\0"
+TREE_VERSION = 1
+TREE_HEADER = struct.Struct("<8sI")
+TREE_FOOTER = struct.Struct("<Q")
+
+
+def jsonState(state):
+    """Return a random state as JSON-friendly lists."""
+    if isinstance(state, tuple):
+        return [jsonState(value) for value in state]
+    return state
+
+def randomModuleState(state):
+    """Return a random module state read back from JSON as the tuples random.setstate expects."""
+    version, internal, gauss = state
+    return version, tuple(internal), gauss
+
+def saveTree(path, tree, seed):
+    """Write a grown tree to a file.
+    :param path: file to create
+    :type path: str
+    :param tree: grown tree
+    :type tree: Tree
+    :param seed: seed the tree was grown from
+    :type seed: int
+    """
+    data = tree.data
+    with open(path, "wb") as f:
+        f.write(TREE_HEADER.pack(TREE_MAGIC, TREE_VERSION))
+        layout = appendArrays(f, {field: getattr(data, field) for field in BranchArrays.FIELDS})
+        index = dict(version=TREE_VERSION, parameters=tree.parameters(), seed=seed, layout=layout,
+                     growthLevel=tree.growthLevel, levelStates=[jsonState(state) for state in tree.levelStates])
+        index = json.dumps(index).encode()
+        f.write(index)
+        f.write(TREE_FOOTER.pack(len(index)))
+
+def readIndex(path):
+    """Return the JSON index of a tree file, checking its magic and version."""
+    with open(path, "rb") as f:
+        magic, version = TREE_HEADER.unpack(f.read(TREE_HEADER.size))
+        if magic != TREE_MAGIC:
+            raise ValueError("not a tree file: %s" % path)
+        if version != TREE_VERSION:
+            raise ValueError("unsupported tree file version %d: %s" % (version, path))
+        f.seek(-TREE_FOOTER.size, 2)
+        indexSize, = TREE_FOOTER.unpack(f.read(TREE_FOOTER.size))
+        f.seek(-TREE_FOOTER.size - indexSize, 2)
+        return json.loads(f.read(indexSize))
+
+def loadTree(path):
+    """Memory-map a tree written by saveTree.
+    The arrays are mapped copy-on-write, so wind can move the loaded tree without touching the
+    file, and the saved random states let it grow to a higher max level as the original could.
+    :param path: tree file
+    :type path: str
+    :returns: the tree and the seed it was grown from
+    :rtype: tuple
+    """
+    index = readIndex(path)
+    parameters = index["parameters"]
+    fields = mapArrays(path, index["layout"], mode="c")
+    tree = Tree(**parameters, seed=index["seed"], data=BranchArrays.fromFields(fields, index.get("growthLevel")))
+    if parameters["growthMode"] == "compatible":
+        tree.levelStates = [randomModuleState(state) for state in index["levelStates"]]
+    else:
+        tree.levelStates = index["levelStates"]
+    while not tree.hasLeaves:
+        tree.grow()
+    return tree, index["seed"]
@@ -0,0 +1,145 @@
+"""Out-of-core growth for trees too large to hold in memory.
+
+growStream grows a tree one generation at a time and appends each generation to a file as
+soon as it is grown, keeping only the newest generation in memory, so peak memory is bounded
+by the two widest generations rather than the whole tree. The leaf positions are written
+last. TreeStream memory-maps the file and streamMesh turns it into mesh pieces one
+generation or leaf chunk at a time.
+"""
+
+import json
+import random
+import struct
+import numpy as np
+
+from .core import BranchArrays, Tree, remap
+from .forest import appendArrays, mapArrays
+from .mesh import LEAF_RADIUS, LEAF_RING_COUNT, LEAF_SEGMENTS, leafMesh, leafTransforms, ringFaces, ringVerts, toBlenderSpace, uvSphere
+
+STREAM_MAGIC = b"ARBSTRM1"
+STREAM_FIELDS = ("begin", "end", "level", "parent", "thickness", "randomOffset", "key")
+# the index is stored after the data, followed by its length
+STREAM_FOOTER = struct.Struct("<Q")
+
+
+def growStream(path, seed, **parameters):
+    """Seed the random module and grow a tree into a stream file, generation by generation.
+    The branches are the ones generateTree gives for the same seed and parameters, in the same
+    order; parent indices refer to the whole tree.
+    :param path: file to create
+    :type path: str
+    :param seed: tree seed
+    :type seed: int
+    :param parameters: keyword arguments for Tree
+    :returns: the stream, memory-mapped
+    :rtype: TreeStream
+    """
+    if parameters.get("clearance", 0) > 0:
+        raise ValueError("collision pruning needs the whole tree in memory and can't be streamed")
+    random.seed(seed)
+    tree = Tree(**parameters)
+    parents = tree.data.parent
+    first = 0
+    generations = []
+    with open(path, "wb") as f:
+        f.write(STREAM_MAGIC)
+        while True:
+            data = tree.data
+            generations.append(appendArrays(f, {field: parents if field == "parent" else getattr(data, field) for field in STREAM_FIELDS}))
+            tree.grow()
+            if tree.hasLeaves:
+                break
+
+            # keep only the new generation; with no parents in memory it grows from its own begins
+            count = len(parents)
+            data = BranchArrays.fromFields({field: getattr(tree.data, field)[count:].copy() for field in BranchArrays.FIELDS}, tree.growthLevel)
+            parents = data.parent + first
+            data.parent[:] = -1
+            first += count
+            tree.data = data
+
+        leaves = appendArrays(f, {"leaves": tree.leaves})
+        index = json.dumps(dict(parameters=tree.parameters(), seed=seed, generations=generations, leaves=leaves)).encode()
+        f.write(index)
+        f.write(STREAM_FOOTER.pack(len(index)))
+    return TreeStream(path)
+
+class TreeStream:
+    """Read-only view of a file written by growStream; arrays are mapped, not loaded."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(STREAM_MAGIC)) != STREAM_MAGIC:
+                raise ValueError("not a tree stream: %s" % path)
+            f.seek(-STREAM_FOOTER.size, 2)
+            indexSize, = STREAM_FOOTER.unpack(f.read(STREAM_FOOTER.size))
+            f.seek(-STREAM_FOOTER.size - indexSize, 2)
+            index = json.loads(f.read(indexSize))
+        self.parameters = index["parameters"]
+        self.seed = index["seed"]
+        self.layouts = index["generations"]
+        self.leafLayout = index["leaves"]
+
+    def __len__(self):
+        return sum(layout[0][2][0] for layout in self.layouts)
+
+    @property
+    def generationCount(self):
+        return len(self.layouts)
+
+    def generation(self, level):
+        """Return the arrays of one generation, by field name."""
+        return mapArrays(self.path, self.layouts[level], mode="r")
+
+    def generations(self):
+        for level in range(self.generationCount):
+            yield self.generation(level)
+
+    @property
+    def leaves(self):
+        """Positions of the leaves, one row per terminal branch."""
+        return mapArrays(self.path, self.leafLayout, mode="r")["leaves"]
+
+def streamMesh(stream, sides=6, leafSeed=None, leafSizeVariation=0, chunkSize=1 << 20):
+    """Yield the mesh of a streamed tree in pieces, in Blender space.
+    Pieces hold one generation of branch tubes, or up to chunkSize branches or leaves of one,
+    and index vertices across the whole mesh, so they can be written out one after another.
+    Leaves come last, with rotations and scales drawn chunk by chunk from leafSeed, so they
+    differ from the leaves leafTransforms gives for a whole tree.
+    :param stream: streamed tree
+    :type stream: TreeStream
+    :param sides: number of vertices around each branch ring
+    :type sides: int
+    :param leafSeed: seed of the leaf rotations and scales, or None for no leaves
+    :type leafSeed: int
+    :param leafSizeVariation: maximum fraction a leaf may shrink by
+    :type leafSizeVariation: float
+    :param chunkSize: maximum branches or leaves per piece
+    :type chunkSize: int
+    :returns: float vertices, int32 face sizes and int32 face corners of each piece
+    :rtype: iterator
+    """
+    trunkWidth = stream.parameters["trunkWidth"]
+    first = 0
+    for level in range(stream.generationCount):
+        generation = stream.generation(level)
+        for start in range(0, len(generation["level"]), chunkSize):
+            end = start + chunkSize
+            begins = generation["begin"][start:end]
+            radii = 0.01 * generation["thickness"][start:end]
+            startRadii = 0.01 * np.maximum(remap(generation["level"][start:end] - 1, 0, 5, trunkWidth, 1), 1)
+            verts = toBlenderSpace(ringVerts(begins, generation["end"][start:end], startRadii, radii, sides))
+            yield (verts,) + ringFaces(len(begins), sides, first)
+            first += len(verts)
+
+    if leafSeed is None:
+        return
+    rng = np.random.default_rng(leafSeed)
+    leafVertCount = len(uvSphere(LEAF_SEGMENTS, LEAF_RING_COUNT, LEAF_RADIUS)[0])
+    leaves = stream.leaves
+    for start in range(0, len(leaves), chunkSize):
+        positions = toBlenderSpace(leaves[start:start + chunkSize])
+        verts, faceSizes, faceVerts = leafMesh(positions, *leafTransforms(len(positions), rng, leafSizeVariation))
+        yield verts, faceSizes, faceVerts + first
+        first += len(positions) * leafVertCount
@@ -0,0 +1,129 @@
+"""Poisson-disk thinning of leaves, so deep trees don't stack clumps of overlapping leaves.
+
+Leaves are kept greedily in a fixed pseudo-random priority order, each only if no kept leaf
+lies within the spacing. The greedy result is computed in vectorized rounds: a leaf is kept
+once it outranks every undecided leaf near it, and its undecided neighbours are dropped.
+"""
+
+from math import sqrt
+import numpy as np
+
+from .collision import SegmentGrid, cellKeys
+
+# priorities only depend on the number of leaves, so a tree thins the same way wherever it is grown
+PRIORITY_SEED = 0x1eaf
+COUNT_SEARCH_STEPS = 24
+# the search stops once at most this fraction more leaves than the target remain
+COUNT_TOLERANCE = 0.02
+# fraction of the leaves above which a spacing counts as too small to thin anything
+SATURATED = 0.9
+
+
+def leafPriorities(count):
+    """Return a distinct rank for each of count leaves; higher ranks are kept first."""
+    return np.random.default_rng(PRIORITY_SEED).permutation(count)
+
+def poissonThin(points, spacing, priorities):
+    """Return the indices of a subset of points no two of which are closer than spacing, with
+    every dropped point within twice spacing of a kept one.
+    Points compete within cells spanning spacing first, which bounds the number of neighbours
+    each point has however large spacing is.
+    :param points: positions, shape (n, 3)
+    :type points: numpy.ndarray
+    :param spacing: smallest distance between kept points
+    :type spacing: float
+    :param priorities: distinct rank of each point; higher ranks win
+    :type priorities: numpy.ndarray
+    :returns: indices of the kept points, ascending
+    :rtype: numpy.ndarray
+    """
+    if spacing <= 0 or len(points) < 2:
+        return np.arange(len(points))
+
+    # any two points in a cell with a diagonal of spacing are too close, so only the best of each can stay
+    keys = cellKeys(np.floor(points / (spacing / sqrt(3))).astype(np.int64))
+    order = np.lexsort((-priorities, keys))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = keys[order[1:]] != keys[order[:-1]]
+    survivors = np.sort(order[first])
+    points = points[survivors]
+    priorities = priorities[survivors]
+
+    # points have no length, so cells as wide as spacing already put every close pair in neighbouring cells
+    grid = SegmentGrid(points, points, spacing / 2, spacing)
+    queries, others = grid.candidates(points, points)
+    gaps = points[queries] - points[others]
+    near = (queries != others) & (np.einsum("ij,ij->i", gaps, gaps) < spacing * spacing)
+    queries = queries[near]
+    others = others[near]
+
+    # 0 undecided, 1 kept, 2 dropped
+    state = np.zeros(len(points), dtype=np.int8)
+    best = np.empty(len(points), dtype=np.int64)
+    while True:
+        undecided = state == 0
+        if not undecided.any():
+            break
+        best[:] = -1
+        np.maximum.at(best, queries, priorities[others])
+        kept = undecided & (priorities > best)
+        state[kept] = 1
+        state[others[kept[queries]]] = 2
+        # only pairs of undecided points matter from here on
+        live = state[queries] + state[others] == 0
+        queries = queries[live]
+        others = others[live]
+    return survivors[state == 1]
+
+def thinLeaves(positions, spacing=0, count=0, density=0):
+    """Return the indices of the leaves to keep.
+    :param positions: leaf positions, shape (n, 3)
+    :type positions: numpy.ndarray
+    :param spacing: smallest distance between kept leaves, 0 for none
+    :type spacing: float
+    :param count: number of leaves to aim for, 0 for no target
+    :type count: int
+    :param density: leaves per unit volume of the leaves' bounding box to aim for, 0 for no target
+    :type density: float
+    :returns: indices of the kept leaves, ascending
+    :rtype: numpy.ndarray
+    """
+    priorities = leafPriorities(len(positions))
+    kept = poissonThin(positions, spacing, priorities)
+    if len(positions) == 0:
+        return kept
+
+    extent = np.ptp(positions, axis=0)
+    targets = [count] if count > 0 else []
+    if density > 0:
+        targets.append(max(int(round(density * np.prod(extent))), 1))
+    if not targets or len(kept) <= min(targets):
+        return kept
+    target = min(targets)
+
+    # the kept count falls about as a power of the spacing, so interpolate in log-log space
+    # inside a bracket of spacings keeping at least and fewer than the target
+    low, lowCount = max(spacing, 1e-6 * max(np.linalg.norm(extent), 1e-9)), len(kept)
+    high, highCount = max(np.linalg.norm(extent), low), 1
+    # first guess: the spacing of a lattice filling the bounding box with the target
+    guess = (np.prod(np.maximum(extent, 1e-9 * high)) / target) ** (1 / 3)
+    for step in range(COUNT_SEARCH_STEPS):
+        if len(kept) <= target * (1 + COUNT_TOLERANCE):
+            break
+        if step == 0 and low < guess < high:
+            middle = guess
+        elif lowCount >= SATURATED * len(positions):
+            # below the bracket the count barely moves; step down from above as if leaves covered a surface
+            middle = min(max(high * sqrt(highCount / target), low * (high / low) ** 0.1), low * (high / low) ** 0.9)
+        else:
+            fraction = np.log(lowCount / target) / np.log(lowCount / highCount)
+            middle = low * (high / low) ** np.clip(fraction, 0.1, 0.9)
+        candidate = poissonThin(positions, middle, priorities)
+        if len(candidate) >= target:
+            low, lowCount, kept = middle, len(candidate), candidate
+        else:
+            high, highCount = middle, max(len(candidate), 1)
+    # trim the few extra leaves left by priority
+    if len(kept) > target:
+        kept = np.sort(kept[np.argsort(-priorities[kept], kind="stable")[:target]])
+    return kept
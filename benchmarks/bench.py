@@ -0,0 +1,176 @@
+"""Benchmarks of tree growth, collision pruning, wind, noise, meshing, leaves and leaf thinning, runnable without Blender.
+
+python benchmarks/bench.py --output results.json
+python benchmarks/bench.py --output new.json --compare results.json
+
+Every stage is timed over several runs with perf_counter and run once more under tracemalloc
+for its peak and net allocations. Results are written as JSON; --compare reports the change
+against an earlier file and exits with status 1 if any stage slowed down or grew past the
+tolerance.
+"""
+
+import argparse
+from datetime import datetime, timezone
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from arborbarber.core import defaultParameters, generateTree, noise, noiseArray
+from arborbarber.mesh import leafMesh, leafTransforms, toBlenderSpace, tubeMesh
+from arborbarber.thinning import thinLeaves
+
+DEPTHS = (4, 6, 8)
+BRANCHES = (2, 3, 4)
+QUICK_DEPTHS = (4, 6)
+QUICK_BRANCHES = (2, 3)
+# leaf counts thinned to, 0 keeping every leaf
+LEAF_TARGETS = (0, 200, 2000)
+QUICK_LEAF_TARGETS = (0, 200)
+# clearance of the collision-pruned growth stage
+CLEARANCE = 0.01
+# narrow splits and a tight clearance, where branches crowd together and nearly every one has close neighbours
+DENSE_PARAMETERS = dict(minSplitAngle=0.05, maxSplitAngle=0.15, clearance=0.005)
+# changes smaller than these are noise, whatever their ratio
+MIN_SECONDS = 1e-4
+MIN_BYTES = 64 << 10
+
+
+def measure(function, repeat):
+    """Time function over repeat runs and trace the memory of one more run.
+    :param function: stage to measure, called without arguments
+    :type function: callable
+    :param repeat: number of timed runs
+    :type repeat: int
+    :returns: best and mean seconds, peak traced bytes, net allocated bytes and allocation blocks
+    :rtype: dict
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    function()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    differences = tracemalloc.take_snapshot().compare_to(before, "filename")
+    tracemalloc.stop()
+    return dict(seconds=min(times), meanSeconds=sum(times) / len(times), peakBytes=peak,
+                allocatedBytes=sum(difference.size_diff for difference in differences),
+                allocations=sum(difference.count_diff for difference in differences))
+
+def benchmarkTree(maxLevel, branches, growthMode, leafTarget, repeat, seed=0):
+    """Measure every stage for one tree configuration.
+    :param leafTarget: leaf count the tree is thinned to, 0 to keep every leaf
+    :type leafTarget: int
+    :returns: one result per stage
+    :rtype: list
+    """
+    parameters = dict(defaultParameters(), maxLevel=maxLevel, minNumBranch=branches, maxNumBranch=branches, growthMode=growthMode, leafCount=leafTarget)
+    tree = generateTree(seed, **parameters)
+    leaves = leafTransforms(len(tree.leafIndices), np.random.default_rng(seed))
+    points = np.random.default_rng(seed).random(len(tree.data)) * 1000
+    tips = tree.data.endStill[~tree.data.hasBranches]
+
+    stages = {
+        "grow": lambda: generateTree(seed, **parameters),
+        "growClearance": lambda: generateTree(seed, **parameters, clearance=CLEARANCE),
+        "growClearanceDense": lambda: generateTree(seed, **dict(parameters, **DENSE_PARAMETERS)),
+        "wind": lambda: tree.applyWind(0.5, 0, 0),
+        "noise": lambda: noiseArray(points),
+        "noiseScalar": lambda: [noise(x) for x in points[:1000]],
+        "tubeMesh": lambda: tubeMesh(tree),
+        "leaves": lambda: leafMesh(toBlenderSpace(tree.leaves), *leaves),
+        "leafThinning": lambda: thinLeaves(tips, count=leafTarget or len(tips) // 4),
+    }
+    configuration = dict(maxLevel=maxLevel, branches=branches, growthMode=growthMode, leafTarget=leafTarget, branchCount=len(tree.data), leafCount=len(tree.leafIndices))
+    return [dict(configuration, stage=stage, **measure(function, repeat)) for stage, function in stages.items()]
+
+def environment():
+    """Return what the numbers depend on besides the code."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return dict(python=platform.python_version(), numpy=np.__version__, platform=platform.platform(), processor=platform.processor(),
+                commit=commit, time=datetime.now(timezone.utc).isoformat())
+
+def resultKey(result):
+    # results from before the leaf axis kept every leaf
+    return (result["stage"], result["maxLevel"], result["branches"], result["growthMode"], result.get("leafTarget", 0))
+
+def compare(results, baseline, tolerance):
+    """Print the change of every stage against a baseline and return the regressed ones.
+    :param results: new results
+    :type results: list
+    :param baseline: earlier results
+    :type baseline: list
+    :param tolerance: fractional slowdown or growth allowed before a stage counts as regressed
+    :type tolerance: float
+    :returns: keys of the regressed stages
+    :rtype: list
+    """
+    previous = {resultKey(result): result for result in baseline}
+    regressions = []
+    print("%-18s %5s %8s %-10s %6s %10s %8s %10s %8s" % ("stage", "level", "branches", "mode", "leaves", "seconds", "change", "peak MB", "change"))
+    for result in results:
+        old = previous.get(resultKey(result))
+        if old is None:
+            continue
+        timeRatio = result["seconds"] / max(old["seconds"], 1e-12)
+        memoryRatio = result["peakBytes"] / max(old["peakBytes"], 1)
+        slower = timeRatio > 1 + tolerance and result["seconds"] - old["seconds"] > MIN_SECONDS
+        larger = memoryRatio > 1 + tolerance and result["peakBytes"] - old["peakBytes"] > MIN_BYTES
+        regressed = slower or larger
+        if regressed:
+            regressions.append(resultKey(result))
+        print("%-18s %5d %8d %-10s %6d %10.6f %+7.1f%% %10.2f %+7.1f%%%s" % (result["stage"], result["maxLevel"], result["branches"], result["growthMode"], result["leafTarget"],
+              result["seconds"], 100 * (timeRatio - 1), result["peakBytes"] / (1 << 20), 100 * (memoryRatio - 1), "  REGRESSED" if regressed else ""))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark tree growth, wind, noise, meshing and leaves.")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="fractional slowdown or memory growth allowed by --compare")
+    parser.add_argument("--depths", type=int, nargs="+", help="max levels to sweep, default %s" % (DEPTHS,))
+    parser.add_argument("--branches", type=int, nargs="+", help="branches per split to sweep, default %s" % (BRANCHES,))
+    parser.add_argument("--leaf-targets", type=int, nargs="+", help="leaf counts to thin to, 0 for every leaf, default %s" % (LEAF_TARGETS,))
+    parser.add_argument("--growth-modes", nargs="+", default=["compatible", "vectorized"])
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per stage; the best is reported")
+    parser.add_argument("--quick", action="store_true", help="sweep small trees only")
+    args = parser.parse_args(argv)
+
+    depths = args.depths or (QUICK_DEPTHS if args.quick else DEPTHS)
+    branches = args.branches or (QUICK_BRANCHES if args.quick else BRANCHES)
+    leafTargets = args.leaf_targets or (QUICK_LEAF_TARGETS if args.quick else LEAF_TARGETS)
+    results = []
+    for growthMode in args.growth_modes:
+        for maxLevel in depths:
+            for branchCount in branches:
+                for leafTarget in leafTargets:
+                    results.extend(benchmarkTree(maxLevel, branchCount, growthMode, leafTarget, args.repeat))
+                    print("%s level %d branches %d leaves %d done" % (growthMode, maxLevel, branchCount, leafTarget), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(dict(environment=environment(), results=results), f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+"""Assertions shared by the tests."""
+
+import numpy as np
+
+
+def assertSameTree(tree, other):
+    """Assert two trees have exactly the same branches and leaves."""
+    for field in ("begin", "end", "level", "parent", "randomOffset", "key"):
+        assert np.array_equal(getattr(tree.data, field), getattr(other.data, field)), field
+    assert np.array_equal(tree.leafIndices, other.leafIndices)
@@ -0,0 +1,49 @@
+"""Collision pruning against brute force and its corner cases."""
+
+import numpy as np
+import pytest
+
+from arborbarber.collision import SegmentGrid, collisionCuts, segmentDistances
+from arborbarber.core import GROWTH_MODES, defaultParameters, generateTree
+
+
+@pytest.mark.parametrize("reach", [0.01, 0.05, 0.5])
+def test_gridFindsEveryClosePair(reach):
+    rng = np.random.default_rng(0)
+    begins = rng.uniform(0, 1, (300, 3))
+    # mostly short segments and a few long ones, which cap the samples per segment
+    ends = begins + rng.normal(size=(300, 3)) * np.where(np.arange(300) < 5, 2, 0.2)[:, None]
+    queries, others = SegmentGrid(begins, ends, reach, 4 * reach).candidates(begins, ends)
+    found = set(zip(queries.tolist(), others.tolist()))
+    first, second = np.triu_indices(len(begins), 1)
+    distances, _ = segmentDistances(begins[first], ends[first], begins[second], ends[second])
+    close = distances < reach
+    assert close.any()
+    assert all((i, j) in found and (j, i) in found for i, j in zip(first[close].tolist(), second[close].tolist()))
+
+def test_denseBranchingKeepsClearance():
+    parameters = dict(defaultParameters(), maxLevel=4, minNumBranch=8, maxNumBranch=9, minSplitAngle=0.05, maxSplitAngle=0.15)
+    tree = generateTree(1, **parameters, clearance=0.005)
+    data = tree.data
+    first, second = np.triu_indices(len(data), 1)
+    related = (data.parent[first] == second) | (data.parent[second] == first) | (data.parent[first] == data.parent[second])
+    first, second = first[~related], second[~related]
+    distances, _ = segmentDistances(data.begin[first], data.end[first], data.begin[second], data.end[second])
+    assert distances.min() >= 0.005
+
+@pytest.mark.parametrize("growthMode", GROWTH_MODES)
+@pytest.mark.parametrize("collisionMode", ["shorten", "reject"])
+def test_fullyPrunedLevelStillGrowsLeaves(growthMode, collisionMode):
+    tree = generateTree(1, **dict(defaultParameters(), clearance=0.5, growthMode=growthMode, collisionMode=collisionMode))
+    assert tree.growthLevel == tree.maxLevel
+    assert len(tree.leafIndices)
+
+def test_droppedBranchesDontBlockLaterOnes():
+    begins = np.array([[0.0, 0, 0], [100, 100, 100]])
+    ends = np.array([[10.0, 0, 0], [101, 100, 100]])
+    parents = np.array([-1, 0])
+    # the first new branch crosses the trunk, the second crosses only the first
+    newBegins = np.array([[5.0, -1, 0], [4, 0.5, 0.1]])
+    newEnds = np.array([[5.0, 1, 0], [6, 0.5, 0.1]])
+    keep, fractions = collisionCuts(begins, ends, parents, newBegins, newEnds, np.array([1, 0]), 0.2, shorten=False)
+    assert keep.tolist() == [False, True]
@@ -0,0 +1,170 @@
+"""Noise, rotation and growth against the original per-branch implementation."""
+
+from math import cos, pi, radians, sin
+import random
+import threading
+
+import numpy as np
+import pytest
+
+from arborbarber.core import GROWTH_MODES, PERLIN_SIZE, Tree, defaultParameters, generateTree, noise, noiseArray, perlinTable, rotateAroundMany
+
+from helpers import assertSameTree
+
+
+def scalarNoise(x, y=0, z=0):
+    """The p5py Perlin noise the add-on started from, one value at a time in plain Python."""
+    perlin = perlinTable().tolist()
+    cosTable = [cos(radians(d) * 0.5) for d in range(720)]
+
+    def fsc(i):
+        return 0.5 * (1 - cosTable[int(i * 360) % 720])
+
+    x, y, z = abs(x), abs(y), abs(z)
+    xi, yi, zi = int(x), int(y), int(z)
+    xf, yf, zf = x - xi, y - yi, z - zi
+    r = 0
+    ampl = 0.5
+    for _ in range(4):
+        rxf = fsc(xf)
+        ryf = fsc(yf)
+        of = int(xi + (yi << 4) + (zi << 8))
+        n1 = perlin[of % PERLIN_SIZE]
+        n1 += rxf * (perlin[(of + 1) % PERLIN_SIZE] - n1)
+        n2 = perlin[(of + 16) % PERLIN_SIZE]
+        n2 += rxf * (perlin[(of + 16 + 1) & PERLIN_SIZE] - n2)
+        n1 += ryf * (n2 - n1)
+        of += 256
+        n2 = perlin[of & PERLIN_SIZE]
+        n2 += rxf * (perlin[(of + 1) % PERLIN_SIZE] - n2)
+        n3 = perlin[(of + 16) % PERLIN_SIZE]
+        n3 += rxf * (perlin[(of + 16 + 1) % PERLIN_SIZE] - n3)
+        n2 += ryf * (n3 - n2)
+        n1 += fsc(zf) * (n2 - n1)
+        r += n1 * ampl
+        ampl *= 0.5
+        xi, xf = xi * 2, xf * 2
+        yi, yf = yi * 2, yf * 2
+        zi, zf = zi * 2, zf * 2
+        if xf >= 1:
+            xi, xf = xi + 1, xf - 1
+        if yf >= 1:
+            yi, yf = yi + 1, yf - 1
+        if zf >= 1:
+            zi, zf = zi + 1, zf - 1
+    return r
+
+def originalRotate(vect, axis, angle):
+    """Rodrigues' rotation of one vector, as the add-on first computed it."""
+    axis = axis/np.linalg.norm(axis)
+    return vect * cos(angle) + np.cross(axis, vect) * sin(angle) + axis * (np.dot(axis, vect) * (1 - cos(angle)))
+
+def originalBranches(seed, trunkLen, trunkWidth, minBranchingSize, maxBranchingSize, minNumBranch, maxNumBranch, minSplitAngle, maxSplitAngle, maxLevel):
+    """Grow a tree branch by branch, as the original Branch and Tree classes did.
+    :returns: (begin, end, level, randomOffset) of every branch in growth order
+    :rtype: list
+    """
+    draw = random.Random(seed)
+    branches = [(np.array([0, 0, 0]), np.array([0, -trunkLen, 0]), 0, draw.uniform(0, 1.5) * 0 * 1000)]
+    hasBranches = [False]
+    for growthLevel in range(maxLevel):
+        for i in range(len(branches) - 1, -1, -1):
+            if hasBranches[i]:
+                continue
+            begin, end, level, offset = branches[i]
+            num = draw.randint(minNumBranch, maxNumBranch)
+            split = draw.uniform(maxSplitAngle, minSplitAngle)
+            length = draw.uniform(maxBranchingSize, minBranchingSize)
+            direction = end - begin
+            firstBranchDir = originalRotate(direction, np.cross(np.array([1, 0, 0]), direction), split)
+            branchAngle = 2*pi/num
+            for angle in np.arange(draw.uniform(0, branchAngle), 2*pi, branchAngle):
+                branchDir = originalRotate(firstBranchDir, direction, angle) * length
+                branches.append((end, end + branchDir, level + 1, draw.uniform(0, 1.5) * (level + 1) * 1000))
+                hasBranches.append(False)
+            hasBranches[i] = True
+    return branches
+
+
+def test_noiseArrayMatchesScalarReference():
+    rng = np.random.default_rng(1)
+    points = np.concatenate((rng.uniform(-50, 50, (300, 3)), rng.uniform(0, 1, (100, 3)), [[0, 0, 0], [1, 2, 3], [-0.5, 0, 0]]))
+    values = noiseArray(points[:, 0], points[:, 1], points[:, 2])
+    expected = [scalarNoise(*point) for point in points.tolist()]
+    assert values.tolist() == expected
+    assert noise(*points[0]) == expected[0]
+
+def test_rotateAroundManyMatchesOriginalRotation():
+    rng = np.random.default_rng(0)
+    vects = rng.normal(size=(2000, 3))
+    axes = rng.normal(size=(2000, 3))
+    angles = rng.uniform(0, 2*pi, 2000)
+    expected = np.array([originalRotate(v, a, angle) for v, a, angle in zip(vects, axes, angles)])
+    assert np.array_equal(rotateAroundMany(vects, axes, angles), expected)
+
+@pytest.mark.parametrize("seed", range(4))
+def test_compatibleGrowthMatchesOriginal(seed):
+    parameters = defaultParameters()
+    tree = generateTree(seed, **parameters)
+    begins, ends, levels, offsets = zip(*originalBranches(seed, **parameters))
+    assert np.array_equal(tree.data.begin, np.array(begins, dtype=np.float64))
+    assert np.array_equal(tree.data.end, np.array(ends))
+    assert np.array_equal(tree.data.level, np.array(levels))
+    assert np.array_equal(tree.data.randomOffset, np.array(offsets))
+
+@pytest.mark.parametrize("growthMode", GROWTH_MODES)
+@pytest.mark.parametrize("extra", [dict(), dict(clearance=0.05), dict(clearance=0.1, collisionMode="reject", leafCount=40)])
+def test_chunkedGrowthMatchesWholeLevels(growthMode, extra):
+    parameters = dict(defaultParameters(), maxLevel=5, growthMode=growthMode, **extra)
+    random.seed(6)
+    tree = Tree(**parameters)
+    while not tree.hasLeaves:
+        for _ in tree.growChunks(7):
+            pass
+    assertSameTree(tree, generateTree(6, **parameters))
+
+def test_growthIgnoresReseedingOnOtherThreads():
+    parameters = dict(defaultParameters(), maxLevel=6)
+    random.seed(3)
+    tree = Tree(**parameters)
+    stop = threading.Event()
+
+    def reseed():
+        while not stop.is_set():
+            random.seed(random.random())
+
+    thread = threading.Thread(target=reseed)
+    thread.start()
+    try:
+        while not tree.hasLeaves:
+            tree.grow()
+    finally:
+        stop.set()
+        thread.join()
+    assertSameTree(tree, generateTree(3, **parameters))
+
+def test_subtreeMatchesItsBranchesInTheFullTree():
+    tree = generateTree(8, **dict(defaultParameters(), maxLevel=5, growthMode="counter"))
+    data = tree.data
+    index = int(np.flatnonzero(data.level == 2)[3])
+    inSubtree = np.zeros(len(data), dtype=bool)
+    inSubtree[index] = True
+    for branch in range(index + 1, len(data)):
+        inSubtree[branch] = inSubtree[data.parent[branch]]
+    subtree = tree.subtree(index)
+    for field in ("begin", "end", "level", "randomOffset", "key"):
+        assert np.array_equal(getattr(subtree.data, field), getattr(data, field)[inSubtree]), field
+    assert np.array_equal(subtree.leaves, data.end[inSubtree & ~data.hasBranches])
+
+def test_subtreeNeedsCounterMode():
+    with pytest.raises(ValueError):
+        generateTree(8, **dict(defaultParameters(), maxLevel=3)).subtree(2)
+
+@pytest.mark.parametrize("growthMode", GROWTH_MODES)
+@pytest.mark.parametrize("extra", [dict(), dict(clearance=0.05), dict(leafCount=40)])
+def test_setMaxLevelMatchesFreshGrowth(growthMode, extra):
+    parameters = dict(defaultParameters(), maxLevel=4, growthMode=growthMode, **extra)
+    tree = generateTree(7, **parameters)
+    for maxLevel in (2, 5, 3):
+        tree.setMaxLevel(maxLevel)
+        assertSameTree(tree, generateTree(7, **dict(parameters, maxLevel=maxLevel)))
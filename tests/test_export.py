@@ -0,0 +1,91 @@
+"""Mesh and point cache files read back."""
+
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from arborbarber.core import defaultParameters, generateTree
+from arborbarber.export import readPointCache, writeMesh, writePointCache
+from arborbarber.mesh import leafTransforms, treeMesh
+
+
+@pytest.fixture(scope="module")
+def mesh():
+    tree = generateTree(4, **dict(defaultParameters(), maxLevel=3))
+    return treeMesh(tree, 5, leafTransforms(len(tree.leafIndices), np.random.default_rng(0)))
+
+def pieces(mesh):
+    """Split a mesh in two pieces whose corners index the whole mesh."""
+    verts, faceSizes, faceVerts = mesh
+    vertSplit, faceSplit = len(verts) // 3, len(faceSizes) // 2
+    cornerSplit = int(faceSizes[:faceSplit].sum())
+    return [(verts[:vertSplit], faceSizes[:faceSplit], faceVerts[:cornerSplit]), (verts[vertSplit:], faceSizes[faceSplit:], faceVerts[cornerSplit:])]
+
+def yUp(verts):
+    return np.stack((verts[:, 0], verts[:, 2], -verts[:, 1]), axis=-1)
+
+def triangleCount(faceSizes):
+    return int((faceSizes - 2).sum())
+
+
+def test_obj(tmp_path, mesh):
+    verts, faceSizes, faceVerts = mesh
+    path = str(tmp_path / "tree.obj")
+    writeMesh(path, pieces(mesh))
+    lines = open(path).read().splitlines()
+    objVerts = np.array([line.split()[1:] for line in lines if line.startswith("v ")], dtype=float)
+    faces = [[int(corner) - 1 for corner in line.split()[1:]] for line in lines if line.startswith("f ")]
+    assert np.allclose(objVerts, yUp(verts), atol=1e-6)
+    assert [len(face) for face in faces] == faceSizes.tolist()
+    assert np.concatenate(faces).tolist() == faceVerts.tolist()
+
+def test_ply(tmp_path, mesh):
+    verts, faceSizes, faceVerts = mesh
+    path = str(tmp_path / "tree.ply")
+    writeMesh(path, pieces(mesh))
+    content = open(path, "rb").read()
+    header, body = content.split(b"end_header\n", 1)
+    assert b"element vertex %d" % len(verts) in header and b"element face %d" % len(faceSizes) in header
+    plyVerts = np.frombuffer(body[:12 * len(verts)], dtype="<f4").reshape(-1, 3)
+    assert np.array_equal(plyVerts, verts.astype(np.float32))
+    faces = body[12 * len(verts):]
+    corners = []
+    while faces:
+        size = faces[0]
+        corners.extend(np.frombuffer(faces[1:1 + 4 * size], dtype="<i4").tolist())
+        faces = faces[1 + 4 * size:]
+    assert corners == faceVerts.tolist()
+
+def test_glb(tmp_path, mesh):
+    verts, faceSizes, faceVerts = mesh
+    path = str(tmp_path / "tree.glb")
+    writeMesh(path, pieces(mesh))
+    content = open(path, "rb").read()
+    magic, version, length = struct.unpack_from("<4sII", content)
+    assert (magic, version, length) == (b"glTF", 2, len(content))
+    jsonLength, = struct.unpack_from("<I", content, 12)
+    document = json.loads(content[20:20 + jsonLength])
+    binary = content[20 + jsonLength + 8:]
+    positions, indices = document["accessors"]
+    glbVerts = np.frombuffer(binary[:12 * positions["count"]], dtype="<f4").reshape(-1, 3)
+    triangles = np.frombuffer(binary[12 * positions["count"]:], dtype="<u4").reshape(-1, 3)
+    assert np.array_equal(glbVerts, yUp(verts).astype(np.float32))
+    assert np.allclose(positions["min"], glbVerts.min(axis=0)) and np.allclose(positions["max"], glbVerts.max(axis=0))
+    assert indices["count"] == 3 * len(triangles) == 3 * triangleCount(faceSizes)
+    # each face's fan starts at its first corner
+    firsts = faceVerts[np.cumsum(faceSizes) - faceSizes]
+    assert np.array_equal(triangles[np.cumsum(faceSizes - 2) - (faceSizes - 2), 0], firsts)
+
+def test_unknownFormat(tmp_path, mesh):
+    with pytest.raises(ValueError):
+        writeMesh(str(tmp_path / "tree.fbx"), [mesh])
+
+def test_pointCache(tmp_path):
+    frames = np.random.default_rng(0).random((4, 10, 3)).astype(np.float32)
+    path = str(tmp_path / "wind.pc2")
+    writePointCache(path, frames, startFrame=3)
+    read, startFrame = readPointCache(path)
+    assert startFrame == 3
+    assert np.array_equal(read, frames)
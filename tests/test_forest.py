@@ -0,0 +1,57 @@
+"""Parallel forests and forest-wide wind against tree-by-tree growth and wind."""
+
+import copy
+import glob
+import os
+
+import numpy as np
+import pytest
+
+from arborbarber.core import GROWTH_MODES, defaultParameters, generateTree
+from arborbarber.forest import ForestWind, generateForest, sharedDirectory
+
+from helpers import assertSameTree
+
+SMALL = dict(defaultParameters(), maxLevel=4)
+
+
+@pytest.mark.parametrize("growthMode", GROWTH_MODES)
+@pytest.mark.parametrize("extra", [dict(), dict(leafSpacing=0.2), dict(clearance=0.5)])
+def test_forestMatchesSerial(growthMode, extra):
+    parameters = dict(SMALL, growthMode=growthMode, **extra)
+    jobs = [(parameters, seed) for seed in range(4)]
+    for tree, (parameters, seed) in zip(generateForest(jobs, processes=2), jobs):
+        assertSameTree(tree, generateTree(seed, **parameters))
+
+@pytest.mark.parametrize("growthMode", GROWTH_MODES)
+def test_forestTreesRegrowLikeSerialOnes(growthMode):
+    parameters = dict(SMALL, maxLevel=3, growthMode=growthMode)
+    jobs = [(parameters, seed) for seed in range(3)]
+    for tree, (parameters, seed) in zip(generateForest(jobs, processes=2), jobs):
+        tree.setMaxLevel(4)
+        assertSameTree(tree, generateTree(seed, **dict(parameters, maxLevel=4)))
+        tree.setMaxLevel(2)
+        assertSameTree(tree, generateTree(seed, **dict(parameters, maxLevel=2)))
+
+def test_failedForestLeavesNoFiles():
+    pattern = os.path.join(sharedDirectory(), "arborbarber-*")
+    before = set(glob.glob(pattern))
+    with pytest.raises(ValueError):
+        generateForest([(SMALL, 1), (dict(SMALL, growthMode="unknown"), 2), (SMALL, 3)], processes=2)
+    assert set(glob.glob(pattern)) == before
+
+def test_forestWindMatchesApplyWind():
+    trees = [generateTree(seed, **dict(SMALL, growthMode=growthMode)) for seed, growthMode in enumerate(GROWTH_MODES * 2)]
+    references = copy.deepcopy(trees)
+    phases = np.linspace(0, 5, len(trees))
+    strengths = np.linspace(0.2, 1, len(trees))
+    wind = ForestWind(trees, phases, chunkSize=100)
+    for frame in range(3):
+        wind.apply(strengths, 0.3, 0.7)
+        for tree, reference, phase, strength in zip(trees, references, phases, strengths):
+            reference.timeOffset = wind.time + phase
+            reference.applyWind(strength, 0.3, 0.7)
+            assert np.array_equal(tree.data.begin, reference.data.begin)
+            assert np.array_equal(tree.data.end, reference.data.end)
+        wind.advance()
+    assert np.array_equal(wind.leaves, np.concatenate([reference.leaves for reference in references]))
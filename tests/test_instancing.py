@@ -0,0 +1,31 @@
+"""Instanced trees expanded into meshes."""
+
+import numpy as np
+
+from arborbarber.core import defaultParameters
+from arborbarber.instancing import InstancedTree
+from arborbarber.mesh import LEAF_RING_COUNT, LEAF_SEGMENTS, uvSphere
+
+PARAMETERS = dict(defaultParameters(), maxLevel=4)
+
+
+def sortedRows(points):
+    return points[np.lexsort(np.round(points, 9).T[::-1])]
+
+
+def test_meshHasEveryBranchAndLeaf():
+    tree = InstancedTree(2, 5, True, 0.3, **PARAMETERS)
+    verts, faceSizes, faceVerts = tree.mesh()
+    tips = int(np.prod(tree.counts))
+    leafVertCount = len(uvSphere(LEAF_SEGMENTS, LEAF_RING_COUNT, 1)[0])
+    assert len(verts) == 2 * 5 * tree.branchCount() + leafVertCount * tips
+    assert faceVerts.min() == 0 and faceVerts.max() == len(verts) - 1
+    assert faceSizes.sum() == len(faceVerts)
+
+def test_subtreeMeshesAreCopiesOfTheTemplate():
+    tree = InstancedTree(5, 6, False, **PARAMETERS)
+    subtree = tree.mesh(1)[0]
+    trunk = tree.meshes[0][0]
+    copies = [subtree @ placement[:3, :3].T + placement[:3, 3] for placement in tree.placements[0]]
+    expected = np.concatenate([trunk] + copies)
+    assert np.allclose(sortedRows(tree.mesh()[0]), sortedRows(expected))
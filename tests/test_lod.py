@@ -0,0 +1,35 @@
+"""Level-of-detail chains."""
+
+import numpy as np
+import pytest
+
+from arborbarber import lodChain
+from arborbarber.core import defaultParameters, generateTree
+from arborbarber.lod import leafAncestors, lodLevel, mergedLeaves, prunedTree
+from arborbarber.mesh import leafTransforms, treeMeshVerts
+
+
+@pytest.mark.parametrize("extra", [dict(), dict(leafCount=100), dict(leafSpacing=0.3)])
+def test_lodChainGetsCoarser(extra):
+    tree = generateTree(3, **dict(defaultParameters(), **extra))
+    leaves = leafTransforms(len(tree.leafIndices), np.random.default_rng(0))
+    meshes = lodChain(tree, [1024 / 2**lod for lod in range(5)], 6, leaves)
+    counts = [len(verts) for verts, faceSizes, faceVerts in meshes]
+    assert counts[0] == len(treeMeshVerts(tree, 6, leaves))
+    assert counts == sorted(set(counts), reverse=True)
+
+def test_smallerTreesDropMoreLevels():
+    tree = generateTree(3, **defaultParameters())
+    levels = [lodLevel(tree, pixels) for pixels in (4096, 1024, 256, 64, 16, 4)]
+    assert levels == sorted(levels, reverse=True)
+    assert levels[0] == tree.maxLevel and levels[-1] == 0
+
+def test_lodLeavesStandInForThinnedOnes():
+    tree = generateTree(2, **dict(defaultParameters(), leafCount=60))
+    leaves = (np.zeros((len(tree.leafIndices), 3)), np.ones((len(tree.leafIndices), 3)))
+    pruned = prunedTree(tree, 3)
+    rotations, scales = mergedLeaves(tree, pruned, leaves)
+    assert np.array_equal(pruned.leafIndices, np.unique(leafAncestors(tree, 3)))
+    assert len(rotations) == len(pruned.leafIndices)
+    # leaves grow with the square root of how many they merge
+    assert np.isclose((scales[:, 0] ** 2).sum(), len(tree.leafIndices))
@@ -0,0 +1,42 @@
+"""Tube and leaf meshes."""
+
+import copy
+
+import numpy as np
+import pytest
+
+from arborbarber.core import GROWTH_MODES, defaultParameters, generateTree
+from arborbarber.mesh import bakeWind, leafTransforms, treeMeshVerts, tubeMesh
+
+
+def edgeUses(faceSizes, faceVerts):
+    """Return how many faces use each undirected edge, and how many use it in each direction."""
+    starts = np.cumsum(faceSizes) - faceSizes
+    nexts = np.arange(len(faceVerts)) + 1
+    nexts[starts + faceSizes - 1] = starts
+    edges = np.column_stack((faceVerts, faceVerts[nexts]))
+    undirected = np.unique(np.sort(edges, axis=1), axis=0, return_counts=True)[1]
+    directed = np.unique(edges, axis=0, return_counts=True)[1]
+    return undirected, directed
+
+
+@pytest.mark.parametrize("growthMode", GROWTH_MODES)
+def test_tubeMeshIsClosed(growthMode):
+    tree = generateTree(4, **dict(defaultParameters(), maxLevel=4, growthMode=growthMode))
+    verts, faceSizes, faceVerts = tubeMesh(tree, sides=5)
+    undirected, directed = edgeUses(faceSizes, faceVerts)
+    # every edge borders two faces that run along it in opposite directions
+    assert (undirected == 2).all()
+    assert (directed == 1).all()
+    assert faceVerts.max() < len(verts)
+
+def test_bakeWindMatchesApplyWind():
+    tree = generateTree(2, **dict(defaultParameters(), maxLevel=4))
+    tree.timeOffset = 1.5
+    leaves = leafTransforms(len(tree.leafIndices), np.random.default_rng(0))
+    frames = bakeWind(tree, 5, 0.8, 0.3, 0.7, 6, leaves, chunkFrames=2)
+    for frame, time in enumerate(tree.windTimes(5)):
+        reference = copy.deepcopy(tree)
+        reference.timeOffset = time
+        reference.applyWind(0.8, 0.3, 0.7)
+        assert np.array_equal(frames[frame], treeMeshVerts(reference, 6, leaves).astype(np.float32))
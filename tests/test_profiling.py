@@ -0,0 +1,52 @@
+"""Stage records collected while profiling."""
+
+import threading
+import tracemalloc
+
+from arborbarber import profile
+from arborbarber.core import defaultParameters, generateTree
+from arborbarber.mesh import treeMesh
+from arborbarber.profiling import NULL_STAGE, stage
+
+
+def test_profileCountsGrowthAndMeshing():
+    parameters = dict(defaultParameters(), maxLevel=4)
+    with profile() as profiler:
+        tree = generateTree(1, **parameters)
+        verts = treeMesh(tree)[0]
+    rows = {row["stage"]: row for row in profiler.summary()}
+    assert rows["grow"]["calls"] == parameters["maxLevel"] + 1
+    assert rows["grow"]["branches"] == len(tree.data) - 1
+    assert rows["grow"]["leaves"] == len(tree.leafIndices)
+    assert rows["treeMesh"]["vertices"] == len(verts)
+    assert len(profiler.report()) == sum(row["calls"] for row in rows.values())
+
+def test_stagesCostNothingOutsideProfile():
+    with profile():
+        pass
+    assert stage("grow") is NULL_STAGE
+
+def test_traceAllocations():
+    tracing = tracemalloc.is_tracing()
+    with profile(traceAllocations=True) as profiler:
+        with stage("outer"):
+            with stage("inner"):
+                data = bytearray(1 << 20)
+    inner, outer = profiler.report()
+    assert inner["allocatedBytes"] >= len(data) and inner["peakBytes"] is None
+    assert outer["peakBytes"] >= len(data)
+    assert tracemalloc.is_tracing() == tracing
+
+def test_stagesNestPerThread():
+    records = []
+
+    def worker():
+        with stage("worker") as record:
+            records.append(record)
+
+    with profile():
+        with stage("main"):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+    assert records[0].outermost
@@ -0,0 +1,38 @@
+"""Saving trees and mapping them back."""
+
+import numpy as np
+import pytest
+
+from arborbarber import loadTree, saveTree
+from arborbarber.core import GROWTH_MODES, defaultParameters, generateTree
+
+from helpers import assertSameTree
+
+SMALL = dict(defaultParameters(), maxLevel=4)
+
+
+@pytest.mark.parametrize("growthMode", GROWTH_MODES)
+@pytest.mark.parametrize("extra", [dict(), dict(clearance=0.05, leafCount=30)])
+def test_loadedTreeMatchesSavedOne(tmp_path, growthMode, extra):
+    parameters = dict(SMALL, growthMode=growthMode, **extra)
+    path = str(tmp_path / "tree.arb")
+    saveTree(path, generateTree(9, **parameters), 9)
+    tree, seed = loadTree(path)
+    assert seed == 9
+    assertSameTree(tree, generateTree(9, **parameters))
+    tree.setMaxLevel(5)
+    assertSameTree(tree, generateTree(9, **dict(parameters, maxLevel=5)))
+
+def test_windLeavesTheFileAlone(tmp_path):
+    path = str(tmp_path / "tree.arb")
+    saveTree(path, generateTree(9, **SMALL), 9)
+    tree, _ = loadTree(path)
+    tree.applyWind(1, 0.5, 0.5)
+    assert not np.array_equal(tree.data.end, tree.data.endStill)
+    assertSameTree(loadTree(path)[0], generateTree(9, **SMALL))
+
+def test_otherFilesAreRejected(tmp_path):
+    path = tmp_path / "tree.arb"
+    path.write_bytes(b"not a tree" * 10)
+    with pytest.raises(ValueError):
+        loadTree(str(path))
@@ -0,0 +1,33 @@
+"""Trees grown through a file against trees grown in memory."""
+
+import numpy as np
+import pytest
+
+from arborbarber import growStream, streamMesh
+from arborbarber.core import GROWTH_MODES, defaultParameters, generateTree
+from arborbarber.mesh import toBlenderSpace, tubeMesh
+
+
+def faceTuples(faceSizes, faceVerts):
+    return [tuple(face) for face in np.split(faceVerts, np.cumsum(faceSizes)[:-1])]
+
+
+@pytest.mark.parametrize("growthMode", GROWTH_MODES)
+def test_streamMatchesGenerateTree(tmp_path, growthMode):
+    parameters = dict(defaultParameters(), maxLevel=4, growthMode=growthMode, leafCount=30)
+    stream = growStream(str(tmp_path / "tree.bin"), 5, **parameters)
+    tree = generateTree(5, **parameters)
+    assert np.array_equal(np.concatenate([generation["end"] for generation in stream.generations()]), tree.data.end)
+    assert np.array_equal(stream.leaves, tree.leaves)
+
+def test_streamMeshMatchesTubeMesh(tmp_path):
+    parameters = dict(defaultParameters(), maxLevel=5)
+    stream = growStream(str(tmp_path / "tree.bin"), 3, **parameters)
+    pieces = list(streamMesh(stream, sides=5, leafSeed=0, chunkSize=50))
+    verts, faceSizes, faceVerts = tubeMesh(generateTree(3, **parameters), sides=5)
+    streamed = [np.concatenate(arrays) for arrays in zip(*pieces)]
+    assert np.allclose(streamed[0][:len(verts)], toBlenderSpace(verts))
+    # pieces list their own caps after their quads, so only the set of faces matches
+    tubeFaces = set(faceTuples(streamed[1], streamed[2])[:len(faceSizes)])
+    assert tubeFaces == set(faceTuples(faceSizes, faceVerts))
+    assert streamed[2].max() == len(streamed[0]) - 1
@@ -0,0 +1,27 @@
+"""Leaf thinning against its spacing and count guarantees."""
+
+import numpy as np
+import pytest
+
+from arborbarber.thinning import COUNT_TOLERANCE, leafPriorities, poissonThin, thinLeaves
+
+
+def pairDistances(points, other):
+    return np.linalg.norm(points[:, None, :] - other[None, :, :], axis=-1)
+
+
+@pytest.mark.parametrize("spacing", [0.05, 0.2, 1.0])
+def test_poissonThinKeepsSpacing(spacing):
+    points = np.random.default_rng(0).uniform(0, 2, (800, 3))
+    kept = poissonThin(points, spacing, leafPriorities(len(points)))
+    distances = pairDistances(points[kept], points[kept])
+    np.fill_diagonal(distances, np.inf)
+    assert distances.min() >= spacing
+    dropped = np.setdiff1d(np.arange(len(points)), kept)
+    assert pairDistances(points[dropped], points[kept]).min(axis=1).max() < 2 * spacing
+
+def test_thinLeavesReachesCount():
+    points = np.random.default_rng(1).uniform(0, 2, (3000, 3))
+    kept = thinLeaves(points, count=400)
+    assert 400 <= len(kept) <= 400 * (1 + COUNT_TOLERANCE)
+    assert np.array_equal(kept, np.unique(kept))